@@ -1,13 +1,27 @@
 from forms import LoginForm, SignupForm
-from flask import Flask, render_template, flash, redirect, url_for, session, g, request, jsonify
-from flask_debugtoolbar import DebugToolbarExtension
+from flask import (
+    Blueprint,
+    Flask,
+    current_app,
+    render_template,
+    flash,
+    redirect,
+    url_for,
+    session,
+    g,
+    request,
+    jsonify,
+    abort,
+    Response,
+    stream_with_context,
+)
 from flask_cors import CORS
-from flask_migrate import Migrate
 from flask_jwt_extended import (
     JWTManager,
     create_access_token,
     jwt_required,
     get_jwt_identity,
+    get_jwt,
 )
 from models import (
     db,
@@ -15,97 +29,137 @@ from models import (
     User,
     bcrypt,
     ConsultQuestion,
-    ConsultForm,
     ConsultAnswer,
     Consultation,
+    ConsultationSummary,
     FollowupQuestions,
     FollowupAnswers,
+    Upload,
+)
+from catalog import (
+    bump_catalog_version,
+    get_catalog,
+    get_form,
+    get_latest_form,
+    get_question,
+)
+from config import PROFILES, default_profile, engine_options
+from logging_setup import configure_logging
+from outbox import enqueue_email
+from uploads import UploadRejected, public_path, store_upload
+from images import derivative_urls, schedule_derivatives
+from current_user import CURR_USER, LazyUserGlobals, get_cached_user
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, init_metrics, render_metrics
+from responses import init_responses, matching_etag
+from seed import seed_command
+from summaries import refresh_summaries, summary_item
+from stats import BUCKETS, get_stats
+from review import PATIENT_TRANSITIONS, InvalidTransition, bulk_update_status, check_transition
+from export import FORMATS as EXPORT_FORMATS, export_consultations
+from events import (
+    BACKLOG_LIMIT,
+    claim_stream,
+    events_after,
+    format_event,
+    get_hub,
+    latest_event_id,
+    record_event,
+    release_stream,
+)
+from passwords import (
+    PasswordHashingBusy,
+    TooManyAttempts,
+    check_login_allowed,
+    record_login_failure,
+    record_login_success,
 )
+from sqlalchemy import func
 from sqlalchemy.exc import IntegrityError
 from functools import wraps
+from werkzeug.middleware.proxy_fix import ProxyFix
+import logging
 import os
-import requests
-from requests.auth import HTTPBasicAuth
-from dotenv import load_dotenv
 import hashlib
+import time
 
-# ------------------------
-# ENV
-# ------------------------
-if os.environ.get("RENDER") is None:
-    load_dotenv()
-
-# ------------------------
-# APP INIT
-# ------------------------
-app = Flask(__name__)
-
-# ------------------------
-# JWT CONFIG (ORDER MATTERS)
-# ------------------------
-jwt_key = os.environ.get("JWT_SECRET_KEY")
-if not jwt_key:
-    raise RuntimeError("JWT_SECRET_KEY is not set")
-
-app.config["JWT_SECRET_KEY"] = jwt_key
-app.config["JWT_TOKEN_LOCATION"] = ["headers"]
-app.config["JWT_COOKIE_CSRF_PROTECT"] = False
+log = logging.getLogger(__name__)
 
-jwt = JWTManager(app)
+bp = Blueprint("main", __name__)
+jwt = JWTManager()
 
 # ------------------------
-# CORS
+# APP FACTORY
 # ------------------------
+def create_app(config=None):
+    """Build the app for a profile name from config.PROFILES, or any config object."""
+    if config is None:
+        config = default_profile()
+    if isinstance(config, str):
+        config = PROFILES[config]
+
+    app = Flask(__name__)
+    app.config.from_object(config)
+    # behind Render's proxy remote_addr is the proxy; take the client from X-Forwarded-For
+    hops = app.config.get("PROXY_FIX_HOPS", 0)
+    if hops:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
+    # g.user is resolved on first use instead of in a before_request hook
+    app.app_ctx_globals_class = LazyUserGlobals
+
+    configure_logging(app.config["LOG_LEVEL"], sql_echo=app.config.get("SQL_ECHO", False))
+
+    if not app.config.get("JWT_SECRET_KEY"):
+        raise RuntimeError("JWT_SECRET_KEY is not set")
+
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(app.config))
+    # created on the first upload, see uploads.store_upload
+    app.config.setdefault("UPLOAD_FOLDER", os.path.join(app.root_path, "static", "uploads"))
+
+    jwt.init_app(app)
+    CORS(
+        app,
+        supports_credentials=True,
+        resources={
+            r"/api/*": {
+                "origins": [
+                    "https://dermhub-admin-react.onrender.com",
+                    "http://localhost:5173",
+                    "http://127.0.0.1:5173",
+                    "http://localhost:5189",
+                ],
+                "allow_headers": ["Content-Type", "Authorization"],
+                "methods": ["GET", "POST", "PATCH", "DELETE", "OPTIONS"],
+            }
+        },
+    )
+    connect_db(app)
+    init_metrics(app)
+    init_responses(app)
+    bcrypt.init_app(app)
+    # imported here so `import app` stays cheap; Migrate registers the `flask db` commands
+    from flask_migrate import Migrate
+    Migrate(app, db)
+    app.register_blueprint(bp)
+    app.cli.add_command(seed_command)
 
+    log.info("app created", extra={"fields": {
+        "profile": getattr(config, "__name__", type(config).__name__),
+        "render_service": os.getenv("RENDER_SERVICE_NAME"),
+    }})
+    return app
 
 
-CORS(
-    app,
-    supports_credentials=True,
-    resources={
-        r"/api/*": {
-            "origins": [
-                "https://dermhub-admin-react.onrender.com",
-                "http://localhost:5173",
-                "http://127.0.0.1:5173",
-                "http://localhost:5189",
-            ],
-            "allow_headers": ["Content-Type", "Authorization"],
-            "methods": ["GET", "POST", "PATCH", "DELETE", "OPTIONS"],
-        }
-    },
-)
-
-# ------------------------
-# BASIC CONFIG (NO DUPS)
-# ------------------------
-database_url = os.environ.get("DATABASE_URL", "postgresql:///dermhubdb").replace(
-    "postgres://", "postgresql://", 1
-)
-
-app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "dev-secret")
-app.config["SQLALCHEMY_DATABASE_URI"] = database_url
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-app.config["SQLALCHEMY_ECHO"] = True
-app.config["DEBUG_TB_INTERCEPT_REDIRECTS"] = False
+@bp.get("/metrics")
+def metrics():
+    return render_metrics(), 200, {"Content-Type": METRICS_CONTENT_TYPE}
 
 
-@app.get("/api/debug/jwt-fingerprint")
+@bp.get("/api/debug/jwt-fingerprint")
 def jwt_fingerprint():
-    key = app.config["JWT_SECRET_KEY"]
+    key = current_app.config["JWT_SECRET_KEY"]
     fp = hashlib.sha256(key.encode("utf-8")).hexdigest()[:12]
     return jsonify({"jwt_key_len": len(key), "jwt_key_fp": fp})
 
-# ------------------------
-# EXTENSIONS (INIT ONCE)
-# ------------------------
-connect_db(app)
-bcrypt.init_app(app)
-migrate = Migrate(app, db)
-
-print("JWT_SECRET_KEY length:", len(app.config["JWT_SECRET_KEY"]))
-print("RENDER service:", os.getenv("RENDER_SERVICE_NAME"))
-
 # ------------------------
 # AUTH ERROR HANDLERS (API)
 # ------------------------
@@ -122,58 +176,70 @@ def jwt_expired(jwt_header, jwt_payload):
     return jsonify({"error": "Token expired"}), 401
 
 # ------------------------
-# MAILGUN EMAIL CONFIG
+# SEND MAIL FUNCTION
 # ------------------------
-MAILGUN_DOMAIN  = os.getenv("MAILGUN_DOMAIN")   # Example: sandboxXXXX.mailgun.org
-MAILGUN_API_KEY = os.getenv("MAILGUN_API_KEY") # Starts with key-XXXX
-
-MAILGUN_FROM = f"DermHub <postmaster@{MAILGUN_DOMAIN}>"
-
-MAILGUN_API_BASE = os.getenv("MAILGUN_API_BASE", "https://api.mailgun.net/v3")
-MAILGUN_URL  = f"{MAILGUN_API_BASE}/{MAILGUN_DOMAIN}/messages"
+def mailgun_settings(config):
+    """Mailgun endpoint and credentials, resolved when first needed rather than at import."""
+    domain = config.get("MAILGUN_DOMAIN")
+    api_key = config.get("MAILGUN_API_KEY")
+    if not domain or not api_key:
+        raise RuntimeError("Missing MAILGUN_DOMAIN or MAILGUN_API_KEY")
+    return {
+        "from": config.get("MAILGUN_FROM") or f"DermHub <postmaster@{domain}>",
+        "url": config.get("MAILGUN_URL") or f"{config['MAILGUN_API_BASE']}/{domain}/messages",
+        "api_key": api_key,
+    }
 
-if not MAILGUN_DOMAIN or not MAILGUN_API_KEY:
-    raise RuntimeError("Missing MAILGUN_DOMAIN or MAILGUN_API_KEY")
 
-print("MAILGUN CONFIG OK:", MAILGUN_DOMAIN, MAILGUN_FROM)
+def send_mailgun_email(to_email, subject, text, http=None, idempotency_key=None):
+    """Send a plain-text email via Mailgun.
 
-# ------------------------
-# FILE UPLOAD LOCATION
-# ------------------------
-app.config["UPLOAD_FOLDER"] = os.path.join(app.root_path, "static", "uploads")
-os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
+    The outbox worker passes a pooled requests.Session as http; request handlers
+    should call enqueue_email() instead of calling this directly.
+    """
+    import requests
+    from requests.auth import HTTPBasicAuth
 
-# ------------------------
-# SEND MAIL FUNCTION
-# ------------------------
-def send_mailgun_email(to_email, subject, text):
-    """Send a plain-text email via Mailgun."""
+    mailgun = mailgun_settings(current_app.config)
     data = {
-        "from": MAILGUN_FROM,
+        "from": mailgun["from"],
         "to": [to_email],
         "subject": subject,
         "text": text,
     }
-
-    resp = requests.post(
-        MAILGUN_URL,
-        auth=HTTPBasicAuth("api", MAILGUN_API_KEY),
+    headers = {}
+    if idempotency_key:
+        headers["Idempotency-Key"] = idempotency_key
+        data["v:idempotency_key"] = idempotency_key
+
+    resp = (http or requests).post(
+        mailgun["url"],
+        auth=HTTPBasicAuth("api", mailgun["api_key"]),
         data=data,
+        headers=headers,
         timeout=10,
     )
 
     return (resp.status_code == 200, resp.text)
 
+# admin API responses may be stored by the browser but must be revalidated (cheap with ETags)
+API_CACHE_CONTROL = "private, no-cache"
+
+
+def conditional_json(etag, build, cache_control=API_CACHE_CONTROL):
+    """jsonify(build()) with a strong ETag, or an empty 304 when If-None-Match
+    already has it (or a compressed form of it); build is not called then."""
+    headers = {"ETag": f'"{etag}"', "Cache-Control": cache_control}
+    matched = matching_etag(etag)
+    if matched is not None:
+        return "", 304, {**headers, "ETag": f'"{matched}"'}
+    resp = jsonify(build())
+    resp.headers.update(headers)
+    return resp
+
 # ------------------------
 # USER AUTH SESSION HELPERS
 # ------------------------
-CURR_USER = "curr_user_id"
-
-@app.before_request
-def add_user_to_g():
-    """Runs before every request. If user is logged in, store user object in g."""
-    g.user = User.query.get(session[CURR_USER]) if CURR_USER in session else None
-
 def do_login(user):
     session[CURR_USER] = user.id
 
@@ -181,14 +247,19 @@ def do_logout():
     session.pop(CURR_USER, None)
     flash("You have been logged out!")
 
-def admin_jwt_required(fn):
+def admin_jwt_required(fn=None, *, locations=None):
+    """Require an admin token; locations overrides JWT_TOKEN_LOCATION for one route."""
+    if fn is None:
+        return lambda fn: admin_jwt_required(fn, locations=locations)
+
     @wraps(fn)
-    @jwt_required()
+    @jwt_required(locations=locations)
     def wrapper(*args, **kwargs):
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
-        if not user or not getattr(user, "is_admin", False):
-            return jsonify({"error": "Forbidden"}), 403
+        # tokens from /api/admin/login carry the admin claim; older ones fall back to a lookup
+        if get_jwt().get("is_admin") is not True:
+            user = get_cached_user(int(get_jwt_identity()))
+            if not user or not user.is_admin:
+                return jsonify({"error": "Forbidden"}), 403
         return fn(*args, **kwargs)
     return wrapper
 
@@ -202,7 +273,7 @@ def admin_jwt_required(fn):
 # ------------------------
 # admin login auth
 # ------------------------
-@app.post("/api/admin/login")
+@bp.post("/api/admin/login")
 def api_admin_login():
     data = request.get_json() or {}
     username = data.get("username")
@@ -211,20 +282,27 @@ def api_admin_login():
     if not username or not password:
         return jsonify({"error":"Missing username/password"}), 400
     
-    print("ADMIN LOGIN ATTEMPT:", username)
-    print("ADMIN LOGIN ATTEMPT:", password)
-    user = User.authenticate(username, password)
+    try:
+        check_login_allowed(username, request.remote_addr)
+        user = User.authenticate(username, password)
+    except TooManyAttempts as e:
+        return jsonify({"error": str(e)}), 429, {"Retry-After": str(e.retry_after)}
+    except PasswordHashingBusy as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
     if not user:
+        record_login_failure(username)
         return jsonify({"error": "Invalid credentials"}), 401
+    record_login_success(username)
+    db.session.commit()  # keeps a rehashed password
 
     if not getattr(user, "is_admin", False):
         return jsonify({"error": "Forbidden"}), 403
 
-    token = create_access_token(identity=str(user.id))
-    print("ISSUING token; jwt key len:", len(app.config["JWT_SECRET_KEY"]))
+    token = create_access_token(identity=str(user.id), additional_claims={"is_admin": True})
+    log.info("admin login", extra={"fields": {"user_id": user.id}})
     return jsonify({"access_token": token})
 
-@app.route("/api/admin/signup", methods=["POST"])
+@bp.route("/api/admin/signup", methods=["POST"])
 @admin_jwt_required
 def admin_signup():
     data = request.json or {}
@@ -248,6 +326,8 @@ def admin_signup():
     except IntegrityError:
         db.session.rollback()
         return jsonify({"message": "Username or email taken"}), 400
+    except PasswordHashingBusy as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
     
 
 # ------------------------
@@ -255,12 +335,12 @@ def admin_signup():
 # ------------------------
 
 
-@app.route("/", methods=["GET"])
+@bp.route("/", methods=["GET"])
 def homepage():
-    return redirect(url_for("signup"))
+    return redirect(url_for("main.signup"))
 
 
-@app.route("/signup", methods=["GET", "POST"])
+@bp.route("/signup", methods=["GET", "POST"])
 def signup():
     form = SignupForm()
     if form.validate_on_submit():
@@ -276,40 +356,55 @@ def signup():
         except IntegrityError:
             flash("Username or email already taken", "danger")
             return render_template("signup.html", form=form)
+        except PasswordHashingBusy as e:
+            flash(str(e), "danger")
+            return render_template("signup.html", form=form), 503
 
         do_login(user)
-        return redirect(url_for("dashboard"))
+        return redirect(url_for("main.dashboard"))
     if request.method == "POST":
         for field, errors in form.errors.items():
             for err in errors:
                 flash(f"{field}: {err}", "danger")
-        return redirect(url_for("signup"))
+        return redirect(url_for("main.signup"))
     return render_template("signup.html", form=form)
 
 
 
 
-@app.route("/login", methods=["GET","POST"])
+@bp.route("/login", methods=["GET","POST"])
 def login():
     form = LoginForm()
     if form.validate_on_submit():
-        user = User.authenticate(form.username.data, form.password.data)
+        username = form.username.data
+        try:
+            check_login_allowed(username, request.remote_addr)
+            user = User.authenticate(username, form.password.data)
+        except TooManyAttempts as e:
+            flash(str(e), "danger")
+            return render_template("login.html", form=form), 429, {"Retry-After": str(e.retry_after)}
+        except PasswordHashingBusy as e:
+            flash(str(e), "danger")
+            return render_template("login.html", form=form), 503, {"Retry-After": "1"}
         if user:
+            record_login_success(username)
+            db.session.commit()  # keeps a rehashed password
             do_login(user)
-            return redirect(url_for("dashboard"))
+            return redirect(url_for("main.dashboard"))
+        record_login_failure(username)
         flash("Invalid login", "danger")
     return render_template("login.html", form=form)
 
-@app.route("/logout")
+@bp.route("/logout")
 def logout():
     do_logout()
-    return redirect(url_for("login"))
+    return redirect(url_for("main.login"))
 
-@app.route("/admin")
+@bp.route("/admin")
 def admin_home():
     return render_template("admin/dashboard.html")
 
-@app.errorhandler(401)
+@bp.app_errorhandler(401)
 def unauthorized(e):
     # Let Flask-JWT-Extended return its own JSON for /api/*
     if request.path.startswith("/api/"):
@@ -319,18 +414,30 @@ def unauthorized(e):
 # ------------------------
 # MAIN DASHBOARD
 # ------------------------
-@app.route("/dashboard")
+@bp.route("/dashboard")
 def dashboard():
     if not g.user:
         flash("Please log in first", "warning")
-        return redirect(url_for("login"))
-
-    latest_form = ConsultForm.query.order_by(ConsultForm.id.desc()).first_or_404()
-
-    consultations = Consultation.query\
-        .filter_by(user_id=g.user.id)\
-        .order_by(Consultation.id.desc())\
-        .all()
+        return redirect(url_for("main.login"))
+
+    latest_form = get_latest_form()
+    if latest_form is None:
+        abort(404)
+
+    # plain rows with the prompt from the catalog; no ORM instances to lazy-load
+    rows = db.session.execute(
+        db.select(Consultation.id, Consultation.status, Consultation.primary_question_id)
+        .where(Consultation.user_id == g.user.id)
+        .order_by(Consultation.id.desc())
+    ).all()
+    consultations = []
+    for row in rows:
+        question = get_question(row.primary_question_id)
+        consultations.append({
+            "id": row.id,
+            "status": row.status,
+            "prompt": question["prompt"] if question else None,
+        })
 
     return render_template(
         "dashboard.html",
@@ -341,10 +448,12 @@ def dashboard():
 # ------------------------
 # CONSULTATION FLOW
 # ------------------------
-@app.route("/consult/<int:form_id>", methods=["GET", "POST"])
+@bp.route("/consult/<int:form_id>", methods=["GET", "POST"])
 def consult_form(form_id):
     """Step 1: user selects main concern."""
-    form = ConsultForm.query.get_or_404(form_id)
+    form = get_form(form_id)
+    if form is None:
+        abort(404)
 
     if request.method == "POST":
         selected_qid = request.form.get("concern")
@@ -352,115 +461,474 @@ def consult_form(form_id):
             flash("Select one option", "warning")
             return render_template("consult_form.html", form=form)
 
-        consult = Consultation(user_id=g.user.id, form_id=form.id, primary_question_id=int(selected_qid))
+        consult = Consultation(user_id=g.user.id, form_id=form["id"], primary_question_id=int(selected_qid))
         db.session.add(consult)
+        db.session.flush()
+        refresh_summaries(Consultation.id == consult.id)
+        record_event(consult.id, "created")
         db.session.commit()
 
-        return redirect(url_for("consult_followup", consultation_id=consult.id))
-
-    return render_template("consult_form.html", form=form, questions=form.questions)
+        return redirect(url_for("main.consult_followup", consultation_id=consult.id))
 
-from werkzeug.utils import secure_filename
+    return render_template("consult_form.html", form=form, questions=form["questions"])
 
-@app.route("/consult/<int:consultation_id>/followup", methods=["GET", "POST"])
+@bp.route("/consult/<int:consultation_id>/followup", methods=["GET", "POST"])
 def consult_followup(consultation_id):
-    """Step 2: save follow-up answers and send confirmation email."""
+    """Step 2: save follow-up answers and queue the confirmation email."""
     consult = Consultation.query.get_or_404(consultation_id)
-    primary_q = ConsultQuestion.query.get_or_404(consult.primary_question_id)
-    followup_q = FollowupQuestions.query.filter_by(parent_question_id=primary_q.id).all()
+    primary_q = get_question(consult.primary_question_id)
+    if primary_q is None:
+        abort(404)
+    followup_q = primary_q["followups"]
 
     if request.method == "POST":
+        # patients submit a draft, and answer again when asked for more
+        # information; every other move is an admin's (review.py)
+        source = consult.status
+        target = PATIENT_TRANSITIONS.get(source)
+        if target is None:
+            flash("This consultation has already been submitted", "warning")
+            return redirect(url_for("main.dashboard"))
+
         file = request.files.get("followup-image")
-        file_path = None
+        upload = None
 
         if file and file.filename:
-            filename = secure_filename(file.filename)
-            file_path = os.path.join("static/uploads", filename)
-            file.save(file_path)
-
-        for q in followup_q:
-            answer_val = request.form.get(f"f_answer_{q.id}")
-            db.session.add(FollowupAnswers(
-                consultation_id=consult.id,
-                question_id=q.id,
-                text_answer=answer_val,
-                file_path=file_path
-            ))
+            try:
+                upload = store_upload(file)
+            except UploadRejected as e:
+                flash(str(e), "danger")
+                return render_template("consult_followup.html", followup_q=followup_q)
+
+        changes = {"status": target}
+        if source == "draft":
+            changes["submitted_at"] = func.now()
+        if upload is not None:
+            changes["photo_sha256"] = upload.sha256  # a later post without a file keeps the photo
+        # the status guard also catches a second post racing this one
+        submitted = db.session.execute(
+            db.update(Consultation)
+            .where(Consultation.id == consult.id, Consultation.status == source)
+            .values(**changes)
+        ).rowcount
+        if not submitted:
+            db.session.rollback()
+            flash("This consultation has already been submitted", "warning")
+            return redirect(url_for("main.dashboard"))
+
+        # one multi-row INSERT for all answers instead of a unit-of-work flush per row
+        if followup_q:
+            db.session.execute(db.insert(FollowupAnswers), [
+                {
+                    "consultation_id": consult.id,
+                    "question_id": q["id"],
+                    "text_answer": request.form.get(f"f_answer_{q['id']}"),
+                }
+                for q in followup_q
+            ])
+        refresh_summaries(Consultation.id == consult.id)
+
+        if source == "draft":
+            # written with the answers; the outbox worker sends it
+            enqueue_email(
+                to_email=g.user.email,
+                subject="DermHub Consultation Complete",
+                text="Your consultation has been submitted. Our experts will follow up shortly.",
+                idempotency_key=f"consultation-complete:{consult.id}",
+            )
+            record_event(consult.id, "submitted")
+        else:
+            record_event(consult.id, "status")
         db.session.commit()
 
-        send_mailgun_email(
-            to_email=g.user.email,
-            subject="DermHub Consultation Complete",
-            text="Your consultation has been submitted. Our experts will follow up shortly."
-        )
+        if upload is not None:
+            schedule_derivatives(upload, max_workers=current_app.config["IMAGE_WORKERS"])
 
-        return redirect(url_for("feedback"))
+        return redirect(url_for("main.feedback"))
 
     return render_template("consult_followup.html", followup_q=followup_q)
 
-@app.route("/feedback")
+@bp.route("/feedback")
 def feedback():
     return render_template("feedback.html")
 
-@app.route("/api/consultations")
+CONSULTATIONS_PAGE_SIZE = 50
+CONSULTATIONS_MAX_PAGE_SIZE = 200
+CONSULTATION_FILTERS = ("user_id", "form_id", "primary_question_id")
+CONSULTATIONS_BULK_MAX_IDS = 1000
+
+
+class BadRequestArg(ValueError):
+    """Raised when a query-string argument can't be used."""
+
+
+def int_arg(name, default=None, minimum=None, maximum=None):
+    raw = request.args.get(name)
+    if raw is None or raw == "":
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise BadRequestArg(f"{name} must be an integer")
+    if minimum is not None and value < minimum:
+        raise BadRequestArg(f"{name} must be >= {minimum}")
+    if maximum is not None and value > maximum:
+        value = maximum
+    return value
+
+
+def id_list_arg(name, maximum=CONSULTATIONS_MAX_PAGE_SIZE):
+    raw = request.args.get(name)
+    if not raw:
+        return []
+    try:
+        ids = [int(part) for part in raw.split(",") if part.strip()]
+    except ValueError:
+        raise BadRequestArg(f"{name} must be a comma separated list of integers")
+    if len(ids) > maximum:
+        raise BadRequestArg(f"{name} accepts at most {maximum} ids")
+    return ids
+
+
+@bp.route("/api/consultations")
 @admin_jwt_required
 def api_get_consultations():
-    consults = Consultation.query.all()
-    output = []
-    for c in consults:
-        primary = ConsultQuestion.query.get(c.primary_question_id)
-        output.append({
-            "id": c.id,
-            "status": c.status,
-            "user": f"{c.user.first_name}{c.user.last_name}" if c.user else None,
-            "primary_question": primary.prompt if primary else None,
-        })
-    return jsonify(output)
+    """Keyset-paginated admin listing.
 
-@app.route("/api/consultations/<int:consultation_id>")
-@admin_jwt_required
-def api_get_consultation_detail(consultation_id):
-    c = Consultation.query.get_or_404(consultation_id)
-
-    user = User.query.get(c.user_id)
-    primary = ConsultQuestion.query.get(c.primary_question_id)
-    initial_answer = c.answers[0].answer_text if c.answers else None
-
-    followups_list = []
-    for f in c.followup_answers:
-        fq = FollowupQuestions.query.get(f.question_id)
-        followups_list.append({
-            "prompt": fq.prompt if fq else None,
-            "text_answer": f.text_answer,
-            "file_path": f.file_path
-        })
+    Query params: limit, cursor (id of the last row on the previous page),
+    sort ("id" or "-id"), and filters status, user_id, form_id, primary_question_id, ids.
+    With ids=1,2,3&expand=detail it returns the full detail payload for those ids instead.
+    """
+    sort = request.args.get("sort", "id")
+    if sort not in ("id", "-id"):
+        return jsonify({"error": "sort must be 'id' or '-id'"}), 400
+
+    try:
+        limit = int_arg("limit", CONSULTATIONS_PAGE_SIZE, minimum=1, maximum=CONSULTATIONS_MAX_PAGE_SIZE)
+        cursor = int_arg("cursor")
+        filters = {name: int_arg(name) for name in CONSULTATION_FILTERS}
+        ids = id_list_arg("ids")
+    except BadRequestArg as e:
+        return jsonify({"error": str(e)}), 400
+
+    if request.args.get("expand") == "detail":
+        # prefetch details for a whole page in one request
+        if not ids:
+            return jsonify({"error": "expand=detail requires ids"}), 400
+        return jsonify({"items": load_consultation_details(ids)})
+
+    # one range scan over the summary rows (see summaries.py); no joins, no per-row counts
+    summary = ConsultationSummary
+    query = db.select(
+        summary.consultation_id,
+        summary.status,
+        summary.user_id,
+        summary.first_name,
+        summary.last_name,
+        summary.primary_question_id,
+        summary.answer_count,
+        summary.followup_answer_count,
+        summary.photo_count,
+    )
 
+    if ids:
+        query = query.where(summary.consultation_id.in_(ids))
+    status = request.args.get("status")
+    if status:
+        query = query.where(summary.status == status)
+    for name, value in filters.items():
+        if value is not None:
+            query = query.where(getattr(summary, name) == value)
+
+    # id is unique, so it alone gives a stable order and a seekable cursor
+    if sort == "id":
+        if cursor is not None:
+            query = query.where(summary.consultation_id > cursor)
+        query = query.order_by(summary.consultation_id.asc())
+    else:
+        if cursor is not None:
+            query = query.where(summary.consultation_id < cursor)
+        query = query.order_by(summary.consultation_id.desc())
+
+    # fetch one extra row to know whether there is a next page
+    rows = db.session.execute(query.limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    questions = get_catalog()["questions"]
     return jsonify({
-        "id": c.id,
-        "status": c.status,
+        "items": [summary_item(row, questions) for row in rows],
+        "next_cursor": str(rows[-1].consultation_id) if has_more else None,
+    })
+
+def load_consultation_details(ids):
+    """Detail payloads for ids in id order, built from two row queries (no ORM instances)."""
+    initial_answer = (
+        db.select(ConsultAnswer.answer_text)
+        .where(ConsultAnswer.consultation_id == Consultation.id)
+        .order_by(ConsultAnswer.id)
+        .limit(1)
+        .scalar_subquery()
+    )
+    rows = db.session.execute(
+        db.select(
+            Consultation.id,
+            Consultation.status,
+            User.id.label("user_id"),
+            User.first_name,
+            User.last_name,
+            ConsultQuestion.prompt.label("primary_concern"),
+            initial_answer.label("initial_answer"),
+            Upload.sha256,
+            Upload.extension,
+        )
+        .outerjoin(User, Consultation.user_id == User.id)
+        .outerjoin(ConsultQuestion, Consultation.primary_question_id == ConsultQuestion.id)
+        .outerjoin(Upload, Consultation.photo_sha256 == Upload.sha256)
+        .where(Consultation.id.in_(ids))
+        .order_by(Consultation.id)
+    ).all()
+    followups = db.session.execute(
+        db.select(
+            FollowupAnswers.consultation_id,
+            FollowupQuestions.prompt,
+            FollowupAnswers.text_answer,
+            FollowupAnswers.file_path,
+        )
+        .outerjoin(FollowupQuestions, FollowupAnswers.question_id == FollowupQuestions.id)
+        .where(FollowupAnswers.consultation_id.in_(ids))
+        .order_by(FollowupAnswers.id)
+    ).all()
+
+    followups_by_consultation = {}
+    for f in followups:
+        followups_by_consultation.setdefault(f.consultation_id, []).append(f)
+    return [consultation_detail_item(row, followups_by_consultation.get(row.id, ())) for row in rows]
+
+
+def consultation_detail_item(row, followups):
+    upload = Upload(sha256=row.sha256, extension=row.extension) if row.sha256 else None
+    photo_path = public_path(upload) if upload else None
+    # downscaled copies for the admin screens; empty until the pool has made them
+    photo = derivative_urls(upload) if upload else {}
+
+    return {
+        "id": row.id,
+        "status": row.status,
         "user": {
-            "id": user.id,
-            "first_name": user.first_name,
-            "last_name": user.last_name
-        } if user else None,
-        "primary_concern": primary.prompt if primary else None,
-        "initial_answer": initial_answer,
-        "followup_answers": followups_list
+            "id": row.user_id,
+            "first_name": row.first_name,
+            "last_name": row.last_name
+        } if row.user_id is not None else None,
+        "primary_concern": row.primary_concern,
+        "initial_answer": row.initial_answer,
+        # the photo belongs to the consultation, with or without follow-up answers
+        "file_path": photo_path,
+        "photo": photo,
+        "followup_answers": [
+            {
+                "prompt": f.prompt,
+                "text_answer": f.text_answer,
+                "file_path": photo_path or f.file_path,
+                "photo": photo,
+            }
+            for f in followups
+        ],
+    }
+
+
+@bp.route("/api/consultations/bulk", methods=["PATCH"])
+@admin_jwt_required
+def api_bulk_update_consultations():
+    """Move many consultations to one review status in a single UPDATE.
+
+    JSON body: {"status": target, "ids": [...]} or {"status": target, "filter":
+    {"status": ..., "user_id": ..., "form_id": ..., "primary_question_id": ...}}.
+    Consultations whose current status cannot go to target are skipped.
+    """
+    data = request.get_json(silent=True) or {}
+    target = data.get("status")
+    ids = data.get("ids")
+    filters = data.get("filter")
+    if (ids is None) == (filters is None):
+        return jsonify({"error": "give either ids or filter"}), 400
+
+    where = []
+    try:
+        if not isinstance(target, str):
+            raise BadRequestArg("status must be a string")
+        if ids is not None:
+            if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+                raise BadRequestArg("ids must be a list of integers")
+            if len(ids) > CONSULTATIONS_BULK_MAX_IDS:
+                raise BadRequestArg(f"ids accepts at most {CONSULTATIONS_BULK_MAX_IDS} ids")
+            where.append(Consultation.id.in_(ids))
+        else:
+            unknown = set(filters) - {"status", *CONSULTATION_FILTERS} if isinstance(filters, dict) else True
+            if unknown or not filters:
+                raise BadRequestArg(f"filter takes status, {', '.join(CONSULTATION_FILTERS)}")
+            for name, value in filters.items():
+                if name == "status":
+                    if not isinstance(value, str):
+                        raise BadRequestArg("status must be a string")
+                    check_transition(value, target)
+                elif not isinstance(value, int):
+                    raise BadRequestArg(f"{name} must be an integer")
+                where.append(getattr(Consultation, name) == value)
+        updated = bulk_update_status(target, *where)
+    except (BadRequestArg, InvalidTransition) as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+    db.session.commit()
+
+    body = {"status": target, "updated": updated}
+    if ids is not None:
+        changed = set(updated)
+        body["skipped"] = sorted({i for i in ids if i not in changed})
+    return jsonify(body)
+
+
+@bp.route("/api/consultations/export")
+@admin_jwt_required
+def api_export_consultations():
+    """Every matching consultation with its follow-up answers, streamed as
+    format=csv (default) or ndjson. Filters: status, user_id, form_id, primary_question_id."""
+    fmt = request.args.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+    try:
+        filters = {name: int_arg(name) for name in CONSULTATION_FILTERS}
+    except BadRequestArg as e:
+        return jsonify({"error": str(e)}), 400
+
+    where = [getattr(Consultation, name) == value for name, value in filters.items() if value is not None]
+    status = request.args.get("status")
+    if status:
+        where.append(Consultation.status == status)
+
+    filename = f"consultations-{time.strftime('%Y%m%d')}.{fmt}"
+    return Response(
+        stream_with_context(export_consultations(fmt, *where)),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "X-Accel-Buffering": "no"},
+    )
+
+
+@bp.route("/api/consultations/stream")
+# EventSource cannot set headers, so the browser passes its token as ?jwt=
+@admin_jwt_required(locations=["headers", "query_string"])
+def api_consultation_stream():
+    """Server-sent events for created and submitted consultations.
+
+    Reconnect with Last-Event-ID (or ?last_event_id=) to get what was missed.
+    Each connection ends after STREAM_MAX_SECONDS and the client reconnects.
+    An open stream holds one gthread thread (see gunicorn.conf.py); past
+    STREAM_MAX_CONNECTIONS per process a connection only gets the backlog and
+    ends, so those clients poll every STREAM_RETRY_MS instead.
+    """
+    try:
+        last_id = int(request.headers.get("Last-Event-ID") or request.args.get("last_event_id") or -1)
+    except ValueError:
+        return jsonify({"error": "Last-Event-ID must be an integer"}), 400
+    # read everything we need from the database before the response starts
+    backlog = events_after(last_id) if last_id >= 0 else []
+    if last_id < 0:
+        last_id = latest_event_id()
+    config = current_app.config
+    max_seconds = config.get("STREAM_MAX_SECONDS", 25)
+    keepalive = config.get("STREAM_KEEPALIVE_SECONDS", 10)
+    app = current_app._get_current_object()
+
+    def generate(last_id):
+        yield f"retry: {config.get('STREAM_RETRY_MS', 2000)}\n\n"
+        # an id with no data still sets the client's Last-Event-ID, so a stream
+        # that only sends keepalives reconnects from here instead of from "now"
+        yield f"id: {last_id}\n\n"
+        for event in backlog:
+            last_id = event["id"]
+            yield format_event(event)
+        if len(backlog) == BACKLOG_LIMIT:
+            return  # more to replay; the reconnect picks up from here
+        if max_seconds <= 0 or not claim_stream(config.get("STREAM_MAX_CONNECTIONS", 4)):
+            return
+
+        try:
+            deadline = time.monotonic() + max_seconds
+            hub = get_hub(app)
+            while time.monotonic() < deadline:
+                events = hub.wait(last_id, min(keepalive, deadline - time.monotonic()))
+                if events is None:
+                    return  # fell behind the hub's buffer; reconnecting replays from the table
+                if not events:
+                    yield ": keepalive\n\n"
+                for event in events:
+                    last_id = event["id"]
+                    yield format_event(event)
+        finally:
+            release_stream()
+
+    return Response(generate(last_id), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
     })
 
-@app.route("/api/questions/<int:id>", methods=["GET"])
+@bp.route("/api/consultations/<int:consultation_id>")
+@admin_jwt_required
+def api_get_consultation_detail(consultation_id):
+    # the ETag comes from one narrow row; the object graph is only loaded on a miss
+    row = db.session.execute(
+        db.select(ConsultationSummary.version, Upload.sha256, Upload.extension)
+        .select_from(Consultation)
+        .outerjoin(ConsultationSummary, ConsultationSummary.consultation_id == Consultation.id)
+        .outerjoin(Upload, Consultation.photo_sha256 == Upload.sha256)
+        .where(Consultation.id == consultation_id)
+    ).first()
+    if row is None:
+        abort(404)
+    # derivatives appear after the commit, so count the ready ones into the tag
+    photo = Upload(sha256=row.sha256, extension=row.extension) if row.sha256 else None
+    ready = len(derivative_urls(photo)) if photo else 0
+    etag = f"c{consultation_id}-v{row.version or 0}-catalog{get_catalog()['version']}-p{ready}"
+    return conditional_json(etag, lambda: load_consultation_detail(consultation_id))
+
+
+def load_consultation_detail(consultation_id):
+    details = load_consultation_details([consultation_id])
+    if not details:
+        abort(404)
+    return details[0]
+
+@bp.route("/api/stats")
+@admin_jwt_required
+def api_get_stats():
+    """Consultation counts by status, primary question, form and submission date,
+    plus the median seconds from start to submission. Query params: bucket
+    (day, week or month) and days (window for the date counts and median)."""
+    bucket = request.args.get("bucket", "day")
+    if bucket not in BUCKETS:
+        return jsonify({"error": f"bucket must be one of {', '.join(BUCKETS)}"}), 400
+    try:
+        days = int_arg("days", 30, minimum=1, maximum=366)
+    except BadRequestArg as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(get_stats(bucket, days))
+
+@bp.route("/api/questions/<int:id>", methods=["GET"])
 @admin_jwt_required
 def get_single_question(id):
-    q = ConsultQuestion.query.get_or_404(id)
-    return jsonify(q.to_dict())
+    catalog = get_catalog()
+    q = catalog["questions"].get(id)
+    if q is None:
+        abort(404)
+    return conditional_json(f"catalog-{catalog['version']}", lambda: q)
 
-@app.route("/api/questions")
+@bp.route("/api/questions")
 @admin_jwt_required
 def get_questions():
-    questions = ConsultQuestion.query.all()
-    return jsonify([q.to_dict() for q in questions])
+    catalog = get_catalog()
+    return conditional_json(f"catalog-{catalog['version']}", lambda: list(catalog["questions"].values()))
 
-@app.route("/api/questions", methods=["POST"])
+@bp.route("/api/questions", methods=["POST"])
 @admin_jwt_required
 def create_questions():
     data = request.json
@@ -469,35 +937,53 @@ def create_questions():
         form_id=data["form_id"]
     )
     db.session.add(q)
+    bump_catalog_version()
     db.session.commit()
     return jsonify(q.to_dict())
 
-@app.route("/api/questions/<int:id>", methods=["PATCH"])
+@bp.route("/api/questions/<int:id>", methods=["PATCH"])
 @admin_jwt_required
 def update_question(id):
     q = ConsultQuestion.query.get_or_404(id)
     q.prompt = request.json.get("prompt", q.prompt)
+    # summaries read the prompt from the catalog, so the version bump is enough
+    bump_catalog_version()
     db.session.commit()
     return jsonify(q.to_dict())
 
-@app.route("/api/questions/<int:id>", methods=["DELETE"])
+@bp.route("/api/questions/<int:id>", methods=["DELETE"])
 @admin_jwt_required
 def delete_question(id):
-    q = ConsultQuestion.query.get_or_404(id)
-
-    for f in q.followups:
-        FollowupAnswers.query.filter_by(question_id=f.id).delete()
-        db.session.delete(f)
-
-    ConsultAnswer.query.filter_by(question_id=q.id).delete()
-    Consultation.query.filter_by(primary_question_id=q.id).delete()
-
-    db.session.delete(q)
+    exists = db.session.execute(db.select(ConsultQuestion.id).where(ConsultQuestion.id == id)).first()
+    if not exists:
+        abort(404)
+
+    # a fixed handful of set-based DELETEs however much history the question has;
+    # the FKs also cascade, these keep the order explicit and work where they don't
+    followup_ids = db.select(FollowupQuestions.id).where(FollowupQuestions.parent_question_id == id)
+    consult_ids = db.select(Consultation.id).where(Consultation.primary_question_id == id)
+    statements = [
+        db.delete(ConsultationSummary).where(ConsultationSummary.consultation_id.in_(consult_ids)),
+        db.delete(FollowupAnswers).where(db.or_(
+            FollowupAnswers.question_id.in_(followup_ids),
+            FollowupAnswers.consultation_id.in_(consult_ids),
+        )),
+        db.delete(ConsultAnswer).where(db.or_(
+            ConsultAnswer.question_id == id,
+            ConsultAnswer.consultation_id.in_(consult_ids),
+        )),
+        db.delete(Consultation).where(Consultation.primary_question_id == id),
+        db.delete(FollowupQuestions).where(FollowupQuestions.parent_question_id == id),
+        db.delete(ConsultQuestion).where(ConsultQuestion.id == id),
+    ]
+    for stmt in statements:
+        db.session.execute(stmt, execution_options={"synchronize_session": False})
+    bump_catalog_version()
     db.session.commit()
 
     return jsonify({"deleted": id})
 
-@app.route("/api/questions/<int:parent_id>/followups", methods=["POST"])
+@bp.route("/api/questions/<int:parent_id>/followups", methods=["POST"])
 @admin_jwt_required
 def create_followupQuestions(parent_id):
     data = request.json
@@ -506,35 +992,61 @@ def create_followupQuestions(parent_id):
         parent_question_id=parent_id
     )
     db.session.add(f)
+    bump_catalog_version()
     db.session.commit()
     return jsonify(f.to_dict())
 
-@app.route("/api/followups/<int:id>", methods=["GET"])
+@bp.route("/api/followups/<int:id>", methods=["GET"])
 @admin_jwt_required
 def get_single_followup(id):
-    f = FollowupQuestions.query.get_or_404(id)
-    return jsonify(f.to_dict())
+    catalog = get_catalog()
+    f = catalog["followups"].get(id)
+    if f is None:
+        abort(404)
+    return conditional_json(f"catalog-{catalog['version']}", lambda: f)
 
-@app.route("/api/followups/<int:id>", methods=["PATCH"])
+@bp.route("/api/followups/<int:id>", methods=["PATCH"])
 @admin_jwt_required
 def update_followup(id):
     f = FollowupQuestions.query.get_or_404(id)
     f.prompt = request.json.get("prompt", f.prompt)
+    bump_catalog_version()
     db.session.commit()
     return jsonify(f.to_dict())
 
-@app.route("/api/followups/<int:id>", methods=["DELETE"])
+@bp.route("/api/followups/<int:id>", methods=["DELETE"])
 @admin_jwt_required
 def delete_followup(id):
-    f = FollowupQuestions.query.get_or_404(id)
-    FollowupAnswers.query.filter_by(question_id=id).delete()
-    db.session.delete(f)
+    exists = db.session.execute(db.select(FollowupQuestions.id).where(FollowupQuestions.id == id)).first()
+    if not exists:
+        abort(404)
+    answered = db.session.execute(
+        db.select(FollowupAnswers.consultation_id).where(FollowupAnswers.question_id == id).distinct()
+    ).scalars().all()
+    for stmt in (
+        db.delete(FollowupAnswers).where(FollowupAnswers.question_id == id),
+        db.delete(FollowupQuestions).where(FollowupQuestions.id == id),
+    ):
+        db.session.execute(stmt, execution_options={"synchronize_session": False})
+    if answered:
+        refresh_summaries(Consultation.id.in_(answered))
+    bump_catalog_version()
     db.session.commit()
     return jsonify({"deleted": id})
 
-@app.route('/run-seed')
+@bp.route('/run-seed')
 def run_seed_route():
     from seed import run_seed
-    run_seed()
+    run_seed(current_app._get_current_object())
 
     return "SEED COMPLETE"
+
+
+def __getattr__(name):
+    # `from app import app` and gunicorn's app:app build the default app on first use,
+    # so importing this module has no side effects
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,316 @@
+"""Latency, throughput and SQL counts of the patient and admin flows, checked against a baseline.
+
+    python benchmarks/bench_flow.py [--db URL] [--users 200] [--consultations 2000]
+                                    [--iterations 100] [--threads 4] [--mode client|http|both]
+                                    [--baseline benchmarks/baseline_flow.json] [--save-baseline]
+
+Seeds synthetic users, forms, questions and consultations with answers, then
+walks signup -> login -> dashboard -> consult form -> follow-up -> admin list
+-> admin detail -> admin detail revalidated with its ETag, once through the Flask test client and once over HTTP from
+--threads concurrent clients against a local threaded server. SQL counts come
+from the Server-Timing header, response sizes from Content-Length (the admin
+steps ask for gzip, as browsers do). SQLite allows one writer at a time and fails
+the others with "database is locked", so against SQLite the HTTP run uses a
+single client.
+
+Exits 1 when a step is slower (p50/p95/p99), has lower throughput, or runs more
+SQL statements or sends more bytes than the baseline allows. Latency limits are machine specific:
+re-record the baseline with --save-baseline on the machine that checks it.
+Defaults to a SQLite file; point --db at Postgres for real numbers.
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("APP_CONFIG", "testing")
+
+from flask_jwt_extended import create_access_token
+from werkzeug.serving import make_server
+
+from app import create_app
+from config import TestingConfig
+from models import db, ConsultForm, ConsultQuestion, FollowupQuestions, User
+from seed import SYNTHETIC_PASSWORD, seed_synthetic, synthetic_username
+import images
+import passwords
+
+STEPS = ("signup", "login", "dashboard", "consult_form", "consult_submit",
+         "followup_form", "followup_submit", "admin_list", "admin_detail", "admin_detail_304")
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline_flow.json")
+SQL_COUNT = re.compile(r'desc="(\d+) queries"')
+
+
+def build(url):
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = url
+
+    return create_app(BenchConfig)
+
+
+# ------------------------
+# seeding
+# ------------------------
+def seed(app, n_users, n_consultations, n_forms=2, questions_per_form=5, followups_per_question=3):
+    """Build a catalog and a deterministic synthetic dataset; returns the shape the flows use."""
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        db.session.execute(db.insert(ConsultForm), [{"name": f"Form {f}"} for f in range(n_forms)])
+        form_ids = db.session.scalars(db.select(ConsultForm.id).order_by(ConsultForm.id)).all()
+        db.session.execute(db.insert(ConsultQuestion), [
+            {"prompt": f"Concern {f}.{q}", "form_id": form_id}
+            for f, form_id in enumerate(form_ids) for q in range(questions_per_form)
+        ])
+        questions = db.session.execute(db.select(ConsultQuestion.id, ConsultQuestion.form_id)).all()
+        db.session.execute(db.insert(FollowupQuestions), [
+            {"prompt": f"Follow-up {q.id}.{i}", "parent_question_id": q.id}
+            for q in questions for i in range(followups_per_question)
+        ])
+        followups = defaultdict(list)
+        for fq in db.session.execute(db.select(FollowupQuestions.id, FollowupQuestions.parent_question_id)):
+            followups[fq.parent_question_id].append(fq.id)
+
+        admin = User(username="benchadmin", email="admin@example.com", password_hashed="x",
+                     first_name="Ad", last_name="Min", is_admin=True)
+        db.session.add(admin)
+        db.session.commit()
+        seed_synthetic(n_users, n_consultations, seed=1234, echo=lambda msg: None)
+
+        token = create_access_token(identity=str(admin.id), additional_claims={"is_admin": True})
+        return {
+            "users": n_users,
+            "forms": [(q.form_id, q.id, followups[q.id]) for q in questions],
+            "admin_headers": {"Authorization": f"Bearer {token}", "Accept-Encoding": "gzip"},
+        }
+
+
+# ------------------------
+# drivers
+# ------------------------
+class ClientDriver:
+    """Flask test client, one per simulated patient."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, headers=None, data=None):
+        resp = self.client.open(path, method=method, headers=headers, data=data)
+        return resp.status_code, resp.headers
+
+
+class HTTPDriver:
+    """requests.Session against the local server, one per simulated patient."""
+
+    def __init__(self, base_url):
+        import requests
+
+        self.base_url = base_url
+        self.http = requests.Session()
+
+    def request(self, method, path, headers=None, data=None):
+        resp = self.http.request(method, self.base_url + path, headers=headers, data=data, allow_redirects=False)
+        return resp.status_code, resp.headers
+
+
+def walk(driver, shape, patient, record):
+    """One pass through every step, as one patient."""
+    form_id, question_id, followup_ids = shape["forms"][patient % len(shape["forms"])]
+    name = f"bench{threading.get_ident()}x{time.perf_counter_ns()}"
+
+    def step(label, method, path, expect, headers=None, data=None):
+        start = time.perf_counter()
+        status, resp_headers = driver.request(method, path, headers=headers, data=data)
+        elapsed = time.perf_counter() - start
+        match = SQL_COUNT.search(resp_headers.get("Server-Timing", ""))
+        # a form that fails validation redirects back to itself
+        ok = status == expect and not (status == 302 and resp_headers["Location"].endswith(path))
+        size = int(resp_headers.get("Content-Length", 0))
+        record(label, elapsed, int(match.group(1)) if match else None, size, ok)
+        return resp_headers
+
+    step("signup", "POST", "/signup", 302, data={
+        "username": name, "email": f"{name}@example.com", "password": SYNTHETIC_PASSWORD,
+        "firstname": "Sign", "lastname": "Up",
+    })
+    # each simulated patient comes through the proxy from an address of their own
+    client_addr = f"10.{patient >> 16 & 255}.{patient >> 8 & 255}.{patient & 255}"
+    step("login", "POST", "/login", 302, headers={"X-Forwarded-For": client_addr},
+         data={"username": synthetic_username(patient % shape["users"]), "password": SYNTHETIC_PASSWORD})
+    step("dashboard", "GET", "/dashboard", 200)
+    step("consult_form", "GET", f"/consult/{form_id}", 200)
+    location = step("consult_submit", "POST", f"/consult/{form_id}", 302, data={"concern": question_id})["Location"]
+    followup_path = "/consult/" + location.rstrip("/").split("/consult/")[1]
+    consult_id = int(followup_path.split("/")[2])
+    step("followup_form", "GET", followup_path, 200)
+    step("followup_submit", "POST", followup_path, 302,
+         data={f"f_answer_{fid}": "bench answer" for fid in followup_ids})
+    step("admin_list", "GET", "/api/consultations", 200, headers=shape["admin_headers"])
+    etag = step("admin_detail", "GET", f"/api/consultations/{consult_id}", 200, headers=shape["admin_headers"])["ETag"]
+    step("admin_detail_304", "GET", f"/api/consultations/{consult_id}", 304,
+         headers={**shape["admin_headers"], "If-None-Match": etag})
+
+
+def run(make_driver, shape, iterations, threads):
+    samples = defaultdict(list)
+    sql = defaultdict(list)
+    sizes = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+
+    def record(label, elapsed, statements, size, ok):
+        with lock:
+            samples[label].append(elapsed)
+            sizes[label].append(size)
+            if statements is not None:
+                sql[label].append(statements)
+            if not ok:
+                errors[label] += 1
+
+    def patient(worker):
+        driver = make_driver()
+        for i in range(iterations):
+            walk(driver, shape, worker * iterations + i, record)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(patient, range(threads)))
+    wall = time.perf_counter() - start
+
+    return {label: summarize(samples[label], sql[label], sizes[label], errors[label], wall) for label in STEPS}
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def median(values):
+    return sorted(values)[len(values) // 2] if values else None
+
+
+def summarize(timings, statements, sizes, errors, wall):
+    timings = sorted(timings)
+    return {
+        "p50_ms": round(percentile(timings, 50) * 1000, 3),
+        "p95_ms": round(percentile(timings, 95) * 1000, 3),
+        "p99_ms": round(percentile(timings, 99) * 1000, 3),
+        # requests of this step per second of wall time; steps share the wall clock
+        "rps": round(len(timings) / wall, 1),
+        "sql": median(statements),
+        "bytes": median(sizes),
+        "errors": errors,
+    }
+
+
+def serve(app):
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ------------------------
+# baseline
+# ------------------------
+def regressions(results, baseline, tolerance, min_delta_ms):
+    found = []
+    for mode, steps in results.items():
+        for label, now in steps.items():
+            then = baseline.get(mode, {}).get(label)
+            if then is None:
+                continue
+            if now["errors"] > then["errors"]:
+                found.append(f"{mode}/{label}: {now['errors']} errors (baseline {then['errors']})")
+            if now["sql"] is not None and then["sql"] is not None and now["sql"] > then["sql"]:
+                found.append(f"{mode}/{label}: {now['sql']} SQL statements (baseline {then['sql']})")
+            if then.get("bytes") is not None and now["bytes"] > then["bytes"] * (1 + tolerance):
+                found.append(f"{mode}/{label}: {now['bytes']} bytes (baseline {then['bytes']})")
+            for key in ("p50_ms", "p95_ms", "p99_ms"):
+                limit = max(then[key] * (1 + tolerance), then[key] + min_delta_ms)
+                if now[key] > limit:
+                    found.append(f"{mode}/{label}: {key} {now[key]:.2f} > {limit:.2f} (baseline {then[key]:.2f})")
+            if now["rps"] < then["rps"] * (1 - tolerance):
+                found.append(f"{mode}/{label}: {now['rps']} req/s (baseline {then['rps']})")
+    return found
+
+
+def report(mode, steps):
+    print(f"\n{mode}", file=sys.stderr)
+    print(f"  {'step':<16}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'sql':>6}{'bytes':>8}{'err':>5}",
+          file=sys.stderr)
+    for label, r in steps.items():
+        print(f"  {label:<16}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+              f"{r['rps']:>9.1f}{r['sql'] if r['sql'] is not None else '-':>6}{r['bytes']:>8}{r['errors']:>5}",
+              file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="sqlite:////tmp/dermhub_bench_flow.db")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--consultations", type=int, default=2000)
+    parser.add_argument("--iterations", type=int, default=100, help="passes per thread")
+    parser.add_argument("--threads", type=int, default=4, help="concurrent HTTP clients")
+    parser.add_argument("--mode", choices=("client", "http", "both"), default="both")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative slowdown")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="ignore latency changes below this")
+    args = parser.parse_args()
+
+    app = build(args.db)
+    shape = seed(app, args.users, args.consultations)
+    results = {}
+    try:
+        if args.mode in ("client", "both"):
+            results["client"] = run(lambda: ClientDriver(app), shape, args.iterations, 1)
+        if args.mode in ("http", "both"):
+            threads = args.threads if not args.db.startswith("sqlite") else 1
+            logging.getLogger("werkzeug").setLevel(logging.WARNING)
+            server = serve(app)
+            base_url = f"http://127.0.0.1:{server.server_port}"
+            try:
+                results["http"] = run(lambda: HTTPDriver(base_url), shape, args.iterations, threads)
+            finally:
+                server.shutdown()
+    finally:
+        passwords.shutdown_pool()
+        images.shutdown_pool()
+
+    for mode, steps in results.items():
+        report(mode, steps)
+
+    params = {k: getattr(args, k) for k in ("users", "consultations", "iterations", "threads")}
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"params": params, **results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nbaseline written to {args.baseline}", file=sys.stderr)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nno baseline at {args.baseline}; run with --save-baseline", file=sys.stderr)
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("params") != params:
+        print(f"\nbaseline was recorded with {baseline.get('params')}, not {params}", file=sys.stderr)
+        return 1
+
+    found = regressions(results, baseline, args.tolerance, args.min_delta_ms)
+    for line in found:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    if not found:
+        print("\nno regressions against baseline", file=sys.stderr)
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
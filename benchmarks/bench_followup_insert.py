@@ -0,0 +1,98 @@
+"""Per-submission latency of writing follow-up answers: ORM add() per row vs one bulk INSERT.
+
+    python benchmarks/bench_followup_insert.py [--db URL] [--followups 12] [--submissions 300]
+
+Defaults to an in-memory SQLite database; point --db at Postgres for real numbers.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from flask import Flask
+
+from models import db, Consultation, ConsultForm, ConsultQuestion, FollowupAnswers, FollowupQuestions
+
+
+def make_app(url):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = url
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    return app
+
+
+def setup_catalog(n_followups):
+    form = ConsultForm(name="Bench Form")
+    db.session.add(form)
+    db.session.flush()
+    question = ConsultQuestion(prompt="Acne", form_id=form.id)
+    db.session.add(question)
+    db.session.flush()
+    followups = [FollowupQuestions(prompt=f"Follow-up {i}", parent_question_id=question.id)
+                 for i in range(n_followups)]
+    db.session.add_all(followups)
+    db.session.commit()
+    return form.id, question.id, [f.id for f in followups]
+
+
+def submit_per_row(consult_id, followup_ids):
+    consult = db.session.get(Consultation, consult_id)
+    for qid in followup_ids:
+        db.session.add(FollowupAnswers(consultation_id=consult_id, question_id=qid,
+                                       text_answer="answer", file_path="static/uploads/photo.jpg"))
+    consult.status = "submitted"
+    db.session.commit()
+
+
+def submit_bulk(consult_id, followup_ids):
+    db.session.execute(db.insert(FollowupAnswers), [
+        {"consultation_id": consult_id, "question_id": qid, "text_answer": "answer"}
+        for qid in followup_ids
+    ])
+    db.session.execute(
+        db.update(Consultation).where(Consultation.id == consult_id).values(status="submitted")
+    )
+    db.session.commit()
+
+
+def run(label, submit, form_id, question_id, followup_ids, submissions):
+    timings = []
+    for _ in range(submissions):
+        consult = Consultation(form_id=form_id, primary_question_id=question_id)
+        db.session.add(consult)
+        db.session.commit()
+        consult_id = consult.id
+        db.session.expunge_all()
+
+        start = time.perf_counter()
+        submit(consult_id, followup_ids)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<10} median {statistics.median(timings):7.3f} ms   p95 {p95:7.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="sqlite://")
+    parser.add_argument("--followups", type=int, default=12)
+    parser.add_argument("--submissions", type=int, default=300)
+    args = parser.parse_args()
+
+    app = make_app(args.db)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        form_id, question_id, followup_ids = setup_catalog(args.followups)
+        run("per-row", submit_per_row, form_id, question_id, followup_ids, args.submissions)
+        run("bulk", submit_bulk, form_id, question_id, followup_ids, args.submissions)
+        db.drop_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Per-request latency of the admin listing with SQL_ECHO off vs on.
+
+    python benchmarks/bench_sql_echo.py [--db URL] [--requests 500] 2> /dev/null
+
+Echoed SQL is logged as JSON lines on stderr like every other record, results
+go to stdout. Defaults to a SQLite file.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("APP_CONFIG", "testing")
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from config import TestingConfig
+from models import db, Consultation, ConsultForm, ConsultQuestion, User
+
+
+def build(url, echo):
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = url
+        SQL_ECHO = echo
+
+    return create_app(BenchConfig)
+
+
+def seed(app, rows):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        form = ConsultForm(name="Bench Form")
+        db.session.add(form)
+        db.session.flush()
+        question = ConsultQuestion(prompt="Acne", form_id=form.id)
+        db.session.add(question)
+        db.session.flush()
+        for i in range(rows):
+            user = User(username=f"bench{i}", email=f"bench{i}@test.com", password_hashed="x")
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(Consultation(user_id=user.id, form_id=form.id, primary_question_id=question.id))
+        db.session.commit()
+        return create_access_token(identity="1", additional_claims={"is_admin": True})
+
+
+def run(label, app, token, n):
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {token}"}
+    timings = []
+    for _ in range(n):
+        start = time.perf_counter()
+        client.get("/api/consultations", headers=headers)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<9} median {statistics.median(timings):7.3f} ms   p95 {p95:7.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="sqlite:////tmp/dermhub_bench.db")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--rows", type=int, default=50)
+    args = parser.parse_args()
+
+    quiet = build(args.db, echo=False)
+    token = seed(quiet, args.rows)
+    run("echo off", quiet, token, args.requests)
+    run("echo on", build(args.db, echo=True), token, args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Per-worker cache of the question catalog (form -> primary questions -> follow-ups).
+
+The catalog only changes when an admin edits it, so the customer flow reads it
+from memory. Every admin edit calls bump_catalog_version() inside its own
+transaction; workers compare their cached version against the catalog_version
+row at most once every CATALOG_VERSION_TTL seconds and reload when it moved.
+"""
+import threading
+import time
+
+from flask import current_app
+
+from models import db, CatalogVersion, ConsultForm, ConsultQuestion, FollowupQuestions
+
+DEFAULT_VERSION_TTL = 5  # seconds between version checks
+
+_lock = threading.Lock()
+_snapshot = None  # dict built by _load(), replaced wholesale on reload
+_checked_at = 0.0
+
+
+def _current_version():
+    version = db.session.execute(
+        db.select(CatalogVersion.version).where(CatalogVersion.id == 1)
+    ).scalar()
+    return version or 0
+
+
+def _load(version):
+    """Read the whole catalog as plain dicts (no ORM instances leave this function)."""
+    forms = db.session.execute(
+        db.select(ConsultForm.id, ConsultForm.name).order_by(ConsultForm.id)
+    ).all()
+    questions = db.session.execute(
+        db.select(ConsultQuestion.id, ConsultQuestion.prompt, ConsultQuestion.form_id)
+        .order_by(ConsultQuestion.id)
+    ).all()
+    followups = db.session.execute(
+        db.select(FollowupQuestions.id, FollowupQuestions.prompt, FollowupQuestions.parent_question_id)
+        .order_by(FollowupQuestions.id)
+    ).all()
+
+    forms_by_id = {f.id: {"id": f.id, "name": f.name, "questions": []} for f in forms}
+    questions_by_id = {}
+    for q in questions:
+        question = {"id": q.id, "prompt": q.prompt, "form_id": q.form_id, "followups": []}
+        questions_by_id[q.id] = question
+        if q.form_id in forms_by_id:
+            forms_by_id[q.form_id]["questions"].append(question)
+
+    followups_by_id = {}
+    for f in followups:
+        followup = {"id": f.id, "prompt": f.prompt, "parent_question_id": f.parent_question_id}
+        followups_by_id[f.id] = followup
+        if f.parent_question_id in questions_by_id:
+            questions_by_id[f.parent_question_id]["followups"].append(followup)
+
+    return {
+        "version": version,
+        "forms": forms_by_id,
+        "questions": questions_by_id,
+        "followups": followups_by_id,
+    }
+
+
+def get_catalog():
+    """Return the cached catalog, reloading it if the stored version moved."""
+    global _snapshot, _checked_at
+
+    ttl = current_app.config.get("CATALOG_VERSION_TTL", DEFAULT_VERSION_TTL)
+    now = time.monotonic()
+    snapshot = _snapshot
+    if snapshot is not None and now - _checked_at < ttl:
+        return snapshot
+
+    with _lock:
+        if _snapshot is not None and time.monotonic() - _checked_at < ttl:
+            return _snapshot
+        version = _current_version()
+        if _snapshot is None or _snapshot["version"] != version:
+            _snapshot = _load(version)
+        _checked_at = time.monotonic()
+        return _snapshot
+
+
+def bump_catalog_version():
+    """Mark the catalog as changed. Call inside the transaction that edits it."""
+    global _checked_at
+
+    result = db.session.execute(
+        db.update(CatalogVersion)
+        .where(CatalogVersion.id == 1)
+        .values(version=CatalogVersion.version + 1)
+    )
+    if result.rowcount == 0:
+        db.session.add(CatalogVersion(id=1, version=1))
+    # force this worker to re-check on its next read instead of waiting out the ttl
+    _checked_at = 0.0
+
+
+def clear_catalog_cache():
+    """Drop the cached snapshot (used by tests that rebuild the schema)."""
+    global _snapshot, _checked_at
+    with _lock:
+        _snapshot = None
+        _checked_at = 0.0
+
+
+def get_form(form_id):
+    return get_catalog()["forms"].get(form_id)
+
+
+def get_latest_form():
+    forms = get_catalog()["forms"]
+    return forms[max(forms)] if forms else None
+
+
+def get_question(question_id):
+    return get_catalog()["questions"].get(question_id)
@@ -0,0 +1,122 @@
+"""Configuration profiles for create_app().
+
+Pick one with APP_CONFIG=development|testing|production. Without it, Render
+deployments get production and everything else gets development.
+"""
+import os
+
+from dotenv import load_dotenv
+from sqlalchemy.pool import StaticPool
+
+if os.environ.get("RENDER") is None:
+    load_dotenv()
+
+
+def _int_env(name, default):
+    return int(os.environ.get(name, default))
+
+
+def database_url(default):
+    return os.environ.get("DATABASE_URL", default).replace("postgres://", "postgresql://", 1)
+
+
+class Config:
+    SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret")
+    JWT_SECRET_KEY = os.environ.get("JWT_SECRET_KEY")
+    JWT_TOKEN_LOCATION = ["headers"]
+    JWT_COOKIE_CSRF_PROTECT = False
+
+    SQLALCHEMY_DATABASE_URI = database_url("postgresql:///dermhubdb")
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # SQLALCHEMY_ECHO stays off: it adds its own synchronous stdout handler. SQL_ECHO
+    # logs statements through the queue handler instead (logging_setup.py)
+    SQLALCHEMY_ECHO = False
+    SQL_ECHO = False
+
+    # engine pool; only applied to Postgres, see engine_options()
+    DB_POOL_SIZE = _int_env("DB_POOL_SIZE", 5)
+    DB_MAX_OVERFLOW = _int_env("DB_MAX_OVERFLOW", 10)
+    DB_POOL_RECYCLE = _int_env("DB_POOL_RECYCLE", 1800)  # seconds
+    DB_STATEMENT_TIMEOUT_MS = _int_env("DB_STATEMENT_TIMEOUT_MS", 15000)
+
+    MAILGUN_DOMAIN = os.environ.get("MAILGUN_DOMAIN")  # Example: sandboxXXXX.mailgun.org
+    MAILGUN_API_KEY = os.environ.get("MAILGUN_API_KEY")  # Starts with key-XXXX
+    MAILGUN_API_BASE = os.environ.get("MAILGUN_API_BASE", "https://api.mailgun.net/v3")
+    # `python outbox.py` serves its Mailgun metrics on this port; 0 means off
+    OUTBOX_METRICS_PORT = _int_env("OUTBOX_METRICS_PORT", 0)
+
+    MAX_UPLOAD_BYTES = 15 * 1024 * 1024
+    # werkzeug rejects bigger request bodies from Content-Length before reading them
+    MAX_CONTENT_LENGTH = MAX_UPLOAD_BYTES + 1024 * 1024
+    IMAGE_WORKERS = _int_env("IMAGE_WORKERS", 2)
+
+    # proxies in front of the app whose X-Forwarded-For/-Proto we trust; 0 means
+    # none, so remote_addr (and the login throttle per IP) is the socket peer
+    PROXY_FIX_HOPS = _int_env("PROXY_FIX_HOPS", 0)
+
+    LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+    # log SQL statements slower than this many milliseconds; unset means off
+    SLOW_QUERY_MS = float(os.environ["SLOW_QUERY_MS"]) if os.environ.get("SLOW_QUERY_MS") else None
+
+    # open /api/consultations/stream connections per process; keep it below the
+    # gunicorn thread count (gunicorn.conf.py), the rest fall back to polling
+    STREAM_MAX_CONNECTIONS = _int_env("STREAM_MAX_CONNECTIONS", 4)
+
+    # jsonify() encoder, see responses.py; falls back to "default" when orjson is missing
+    JSON_PROVIDER = os.environ.get("JSON_PROVIDER", "orjson")
+    # gzip/brotli bodies at least this big for clients that accept it
+    COMPRESS_MIN_BYTES = _int_env("COMPRESS_MIN_BYTES", 1024)
+    COMPRESS_LEVEL = _int_env("COMPRESS_LEVEL", 6)
+
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+    SQL_ECHO = os.environ.get("SQL_ECHO") == "1"
+    LOG_LEVEL = os.environ.get("LOG_LEVEL", "DEBUG")
+
+
+class TestingConfig(Config):
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    # in-memory SQLite per process by default, so the suite needs no database
+    # service and parallel runs can't see each other; set TEST_DATABASE_URL for Postgres
+    SQLALCHEMY_DATABASE_URI = os.environ.get("TEST_DATABASE_URL", "sqlite://")
+    JWT_SECRET_KEY = "test-jwt-secret-not-for-production-use"
+    MAILGUN_DOMAIN = "sandbox.test"
+    MAILGUN_API_KEY = "key-test"
+    BCRYPT_LOG_ROUNDS = 4
+    LOG_LEVEL = "WARNING"
+    PROXY_FIX_HOPS = 1  # as in production
+
+
+class ProductionConfig(Config):
+    # Render's load balancer
+    PROXY_FIX_HOPS = _int_env("PROXY_FIX_HOPS", 1)
+
+
+PROFILES = {
+    "development": DevelopmentConfig,
+    "testing": TestingConfig,
+    "production": ProductionConfig,
+}
+
+
+def default_profile():
+    return os.environ.get("APP_CONFIG") or ("production" if os.environ.get("RENDER") else "development")
+
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured database."""
+    url = config["SQLALCHEMY_DATABASE_URI"]
+    if url in ("sqlite://", "sqlite:///:memory:"):
+        # one shared connection, otherwise every checkout would get an empty database
+        return {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+    if not url.startswith("postgresql"):
+        return {"pool_pre_ping": True}
+    return {
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_pre_ping": True,
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+        "connect_args": {"options": f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"},
+    }
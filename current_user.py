@@ -0,0 +1,92 @@
+"""Current-user resolution without a query per request.
+
+g.user is loaded the first time a view or template touches it, not before every
+request, and the fields we use are cached per worker for USER_CACHE_TTL seconds.
+The cache keeps at most USER_CACHE_SIZE users, dropping the least recently used.
+Any ORM update or delete of a User evicts it from this worker's cache right away;
+other workers pick the change up within the TTL.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from flask import current_app, has_request_context, session
+from flask.ctx import _AppCtxGlobals
+from sqlalchemy import event
+
+from models import db, User
+
+CURR_USER = "curr_user_id"
+DEFAULT_USER_CACHE_TTL = 30  # seconds
+DEFAULT_USER_CACHE_SIZE = 10000
+
+_lock = threading.Lock()
+_cache = OrderedDict()  # user id -> (expires_at, CurrentUser or None), least recently used first
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    id: int
+    username: str
+    email: str
+    first_name: str
+    last_name: str
+    is_admin: bool
+
+
+def get_cached_user(user_id):
+    """CurrentUser for user_id (None if there is no such user), cached per worker."""
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(user_id)
+        if entry is not None and entry[0] > now:
+            _cache.move_to_end(user_id)
+            return entry[1]
+
+    row = db.session.execute(
+        db.select(User.id, User.username, User.email, User.first_name, User.last_name, User.is_admin)
+        .where(User.id == user_id)
+    ).first()
+    user = CurrentUser(*row) if row else None
+
+    config = current_app.config
+    ttl = config.get("USER_CACHE_TTL", DEFAULT_USER_CACHE_TTL)
+    with _lock:
+        _cache[user_id] = (now + ttl, user)
+        _cache.move_to_end(user_id)
+        while len(_cache) > config.get("USER_CACHE_SIZE", DEFAULT_USER_CACHE_SIZE):
+            _cache.popitem(last=False)
+    return user
+
+
+def invalidate_user(user_id):
+    with _lock:
+        _cache.pop(user_id, None)
+
+
+def clear_user_cache():
+    """Drop every cached user (used by tests that rebuild the schema)."""
+    with _lock:
+        _cache.clear()
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _evict_changed_user(mapper, connection, target):
+    invalidate_user(target.id)
+
+
+class LazyUserGlobals(_AppCtxGlobals):
+    """flask.g whose `user` attribute resolves from the session on first access."""
+
+    @property
+    def user(self):
+        if "_user" not in self.__dict__:
+            user_id = session.get(CURR_USER) if has_request_context() else None
+            self._user = get_cached_user(user_id) if user_id is not None else None
+        return self._user
+
+    @user.setter
+    def user(self, value):
+        self._user = value
@@ -0,0 +1,214 @@
+"""Change feed of consultations for the admin app (served as server-sent events).
+
+Writes call record_event() before their commit, which adds a consultation_events
+row and, on Postgres, a NOTIFY that is delivered when the transaction commits.
+One EventHub thread per worker process LISTENs for those notifications (other
+databases are polled every STREAM_POLL_INTERVAL seconds), reads the new rows
+once and keeps the latest EVENT_BUFFER_SIZE in memory for every open stream.
+So a new event costs one query per process, however many admin tabs are open.
+
+Event ids only grow, so a client that reconnects with Last-Event-ID gets what
+it missed from the table and then continues from the hub.
+"""
+import json
+import logging
+import select
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+from catalog import get_catalog
+from models import db, ConsultationEvent, ConsultationSummary
+from summaries import summary_item
+
+log = logging.getLogger(__name__)
+
+CHANNEL = "consultation_events"
+ADVISORY_LOCK_KEY = 0x636F6E73  # "cons"
+EVENT_BUFFER_SIZE = 1000
+BACKLOG_LIMIT = 500  # events replayed per connection; the rest on the next reconnect
+DEFAULT_POLL_INTERVAL = 1  # seconds, databases without LISTEN/NOTIFY
+DEFAULT_RETENTION_DAYS = 7
+PRUNE_INTERVAL = 3600  # seconds
+
+
+def record_event(consultation_id, kind):
+    """Queue a change event inside the current transaction; call it just before commit."""
+    record_events([consultation_id], kind)
+
+
+def record_events(consultation_ids, kind):
+    """record_event() for many consultations: one lock, one NOTIFY, one INSERT."""
+    if db.session.get_bind().dialect.name == "postgresql":
+        # held until commit, so event ids become visible in order and the hub
+        # never reads id 11 before a slower transaction commits id 10
+        db.session.execute(db.text("SELECT pg_advisory_xact_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+        db.session.execute(db.text("SELECT pg_notify(:channel, '')"), {"channel": CHANNEL})
+    db.session.execute(
+        db.insert(ConsultationEvent),
+        [{"consultation_id": consultation_id, "kind": kind} for consultation_id in consultation_ids],
+    )
+
+
+def latest_event_id():
+    return db.session.scalar(db.select(db.func.max(ConsultationEvent.id))) or 0
+
+
+def events_after(last_id, limit=BACKLOG_LIMIT):
+    """Events with id > last_id as plain dicts, each with the consultation's summary row."""
+    rows = db.session.execute(
+        db.select(ConsultationEvent, ConsultationSummary)
+        .outerjoin(ConsultationSummary, ConsultationEvent.consultation_id == ConsultationSummary.consultation_id)
+        .where(ConsultationEvent.id > last_id)
+        .order_by(ConsultationEvent.id)
+        .limit(limit)
+    ).all()
+    questions = get_catalog()["questions"]
+    return [
+        {
+            "id": event.id,
+            "kind": event.kind,
+            "consultation_id": event.consultation_id,
+            "at": event.created_at.isoformat() if event.created_at else None,
+            # None once the consultation has been deleted
+            "consultation": summary_item(summary, questions) if summary is not None else None,
+        }
+        for event, summary in rows
+    ]
+
+
+def prune_events(retention_days=DEFAULT_RETENTION_DAYS):
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    db.session.execute(db.delete(ConsultationEvent).where(ConsultationEvent.created_at < cutoff))
+    db.session.commit()
+
+
+class EventHub:
+    """Per-process fan-out of new events to every open stream."""
+
+    def __init__(self, app):
+        self.app = app
+        self._cond = threading.Condition()
+        self._buffer = deque(maxlen=EVENT_BUFFER_SIZE)
+        self._thread = None
+        self._pruned_at = 0.0
+        with app.app_context():
+            # streams asking for anything at or before floor must catch up from the table
+            self.floor = self.high_water = latest_event_id()
+
+    def poll(self):
+        """Read events newer than the buffer and wake every waiting stream."""
+        with self.app.app_context():
+            while True:
+                events = events_after(self.high_water, limit=EVENT_BUFFER_SIZE)
+                if events:
+                    self._publish(events)
+                if len(events) < EVENT_BUFFER_SIZE:
+                    break
+            if time.monotonic() - self._pruned_at > PRUNE_INTERVAL:
+                self._pruned_at = time.monotonic()
+                prune_events(self.app.config.get("EVENT_RETENTION_DAYS", DEFAULT_RETENTION_DAYS))
+
+    def _publish(self, events):
+        with self._cond:
+            for event in events:
+                if len(self._buffer) == self._buffer.maxlen:
+                    self.floor = self._buffer[0]["id"]
+                self._buffer.append(event)
+            self.high_water = events[-1]["id"]
+            self._cond.notify_all()
+
+    def wait(self, last_id, timeout):
+        """Buffered events after last_id, waiting up to timeout for one.
+
+        Returns None when last_id is older than the buffer; the stream should end
+        so the client reconnects and catches up from the table.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if last_id < self.floor:
+                    return None
+                if self.high_water > last_id:
+                    return [e for e in self._buffer if e["id"] > last_id]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self._cond.wait(remaining)
+
+    def start(self):
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="event-hub", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    engine = db.engine
+                if engine.dialect.name == "postgresql":
+                    self._listen(engine)
+                else:
+                    while True:
+                        self.poll()
+                        time.sleep(self.app.config.get("STREAM_POLL_INTERVAL", DEFAULT_POLL_INTERVAL))
+            except Exception:
+                log.exception("event hub failed, restarting")
+                time.sleep(1)
+
+    def _listen(self, engine):
+        # a connection of our own: it never goes back to the pool
+        conn = engine.raw_connection()
+        conn.detach()
+        raw = conn.driver_connection
+        try:
+            raw.autocommit = True
+            raw.cursor().execute(f"LISTEN {CHANNEL}")
+            self.poll()  # anything committed while we were not listening
+            while True:
+                if select.select([raw], [], [], 30) != ([], [], []):
+                    raw.poll()
+                    raw.notifies.clear()
+                self.poll()
+        finally:
+            conn.close()
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_hub(app):
+    """The process-wide hub for app, with its listener thread running."""
+    global _hub
+    with _hub_lock:
+        if _hub is None:
+            _hub = EventHub(app)
+    _hub.start()
+    return _hub
+
+
+_streams = 0
+_streams_lock = threading.Lock()
+
+
+def claim_stream(limit):
+    """Count an open stream in this process, unless limit are open already."""
+    global _streams
+    with _streams_lock:
+        if _streams >= limit:
+            return False
+        _streams += 1
+        return True
+
+
+def release_stream():
+    global _streams
+    with _streams_lock:
+        _streams -= 1
+
+
+def format_event(event):
+    return f"id: {event['id']}\nevent: {event['kind']}\ndata: {json.dumps(event)}\n\n"
@@ -0,0 +1,156 @@
+"""Streaming export of consultations for clinical review.
+
+One query joins consultations, patients, primary questions and follow-up
+answers with their prompts, ordered by consultation. Its rows are fetched
+EXPORT_BATCH_SIZE at a time (a named server-side cursor on Postgres), turned
+into CSV lines or NDJSON objects and sent in chunks of about EXPORT_CHUNK_BYTES.
+Memory stays flat however many rows there are, and the first chunk goes out
+once the first batch is read instead of after the last.
+
+CSV has one line per follow-up answer, repeating the consultation columns; a
+consultation without follow-up answers gets one line with those columns empty.
+NDJSON has one object per consultation with its follow-up answers nested.
+"""
+import csv
+import io
+from itertools import groupby
+from operator import attrgetter
+
+from flask import current_app
+
+from models import db, Consultation, ConsultAnswer, ConsultQuestion, FollowupAnswers, FollowupQuestions, Upload, User
+from uploads import public_path
+
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+EXPORT_BATCH_SIZE = 1000  # rows per fetch from the cursor
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+CONSULTATION_COLUMNS = (
+    "consultation_id", "status", "created_at", "submitted_at",
+    "user_id", "first_name", "last_name",
+    "form_id", "primary_question_id", "primary_concern", "initial_answer", "photo_path",
+)
+FOLLOWUP_COLUMNS = ("followup_question_id", "followup_prompt", "text_answer", "file_path")
+CSV_COLUMNS = CONSULTATION_COLUMNS + FOLLOWUP_COLUMNS
+
+
+def export_query(*where):
+    initial_answer = (
+        db.select(ConsultAnswer.answer_text)
+        .where(ConsultAnswer.consultation_id == Consultation.id)
+        .order_by(ConsultAnswer.id)
+        .limit(1)
+        .scalar_subquery()
+    )
+    return (
+        db.select(
+            Consultation.id.label("consultation_id"),
+            Consultation.status,
+            Consultation.created_at,
+            Consultation.submitted_at,
+            Consultation.user_id,
+            User.first_name,
+            User.last_name,
+            Consultation.form_id,
+            Consultation.primary_question_id,
+            ConsultQuestion.prompt.label("primary_concern"),
+            initial_answer.label("initial_answer"),
+            Upload.sha256,
+            Upload.extension,
+            FollowupAnswers.question_id.label("followup_question_id"),
+            FollowupQuestions.prompt.label("followup_prompt"),
+            FollowupAnswers.text_answer,
+            FollowupAnswers.file_path,
+        )
+        .outerjoin(User, Consultation.user_id == User.id)
+        .outerjoin(ConsultQuestion, Consultation.primary_question_id == ConsultQuestion.id)
+        .outerjoin(Upload, Consultation.photo_sha256 == Upload.sha256)
+        .outerjoin(FollowupAnswers, FollowupAnswers.consultation_id == Consultation.id)
+        .outerjoin(FollowupQuestions, FollowupAnswers.question_id == FollowupQuestions.id)
+        .where(*where)
+        .order_by(Consultation.id, FollowupAnswers.id)
+    )
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def _consultation(row):
+    photo = public_path(Upload(sha256=row.sha256, extension=row.extension)) if row.sha256 else None
+    return {
+        "consultation_id": row.consultation_id,
+        "status": row.status,
+        "created_at": _iso(row.created_at),
+        "submitted_at": _iso(row.submitted_at),
+        "user_id": row.user_id,
+        "first_name": row.first_name,
+        "last_name": row.last_name,
+        "form_id": row.form_id,
+        "primary_question_id": row.primary_question_id,
+        "primary_concern": row.primary_concern,
+        "initial_answer": row.initial_answer,
+        "photo_path": photo,
+    }
+
+
+def _followup(row):
+    return {
+        "followup_question_id": row.followup_question_id,
+        "followup_prompt": row.followup_prompt,
+        "text_answer": row.text_answer,
+        "file_path": row.file_path,
+    }
+
+
+def _csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    consultation_id = consultation = None
+    for row in rows:
+        if row.consultation_id != consultation_id:
+            consultation_id = row.consultation_id
+            consultation = list(_consultation(row).values())
+        writer.writerow(consultation + list(_followup(row).values()))
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _ndjson_lines(rows):
+    dumps = current_app.json.dumps
+    chunk = []
+    size = 0
+    for _, group in groupby(rows, key=attrgetter("consultation_id")):
+        first = next(group)
+        item = _consultation(first)
+        item["followup_answers"] = [
+            _followup(row) for row in (first, *group) if row.followup_question_id is not None
+        ]
+        line = dumps(item) + "\n"
+        chunk.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield "".join(chunk)
+            chunk = []
+            size = 0
+    yield "".join(chunk)
+
+
+def export_consultations(fmt, *where):
+    """Generator of text chunks; run it inside the request (stream_with_context)."""
+    result = db.session.execute(export_query(*where).execution_options(yield_per=EXPORT_BATCH_SIZE))
+    try:
+        lines = _csv_lines(result) if fmt == "csv" else _ndjson_lines(result)
+        for chunk in lines:
+            if chunk:
+                yield chunk
+    finally:
+        result.close()
@@ -0,0 +1,36 @@
+"""Gunicorn settings; `gunicorn app:app` reads this file from the working directory.
+
+gthread workers serve each request on a thread of their own, so an open admin
+event stream (/api/consultations/stream) holds one thread instead of a whole
+worker. The stream route also caps open streams per process at
+STREAM_MAX_CONNECTIONS, below the thread count, so streams can never take the
+threads the patient pages need.
+
+Workers keep their Prometheus values in files under PROMETHEUS_MULTIPROC_DIR,
+which /metrics sums (see metrics.py); the master clears the old files when it
+starts, so a restart begins from zero.
+"""
+import glob
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+timeout = 30
+
+# must be in the environment before the workers import prometheus_client
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/dermhub-metrics")
+
+
+def on_starting(server):
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    os.makedirs(path, exist_ok=True)
+    for leftover in glob.glob(os.path.join(path, "*.db")):
+        os.remove(leftover)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
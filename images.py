@@ -0,0 +1,122 @@
+"""Downscaled derivatives of consultation photos.
+
+After a photo is stored, a process pool writes bounded-size JPEG and WebP copies
+next to the original (ab/cd/<sha256>_<size>.<fmt>) with EXIF stripped, so the
+admin screens never have to pull a full-resolution phone photo. Derivative
+paths come from the hash alone; until they exist the API falls back to the
+original.
+"""
+import atexit
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from uploads import PUBLIC_PREFIX, upload_path, upload_root
+
+log = logging.getLogger(__name__)
+
+SIZES = {
+    "thumbnail": (320, 320),
+    "review": (1600, 1600),
+}
+FORMATS = {
+    "jpeg": ("jpg", {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True}),
+    "webp": ("webp", {"format": "WEBP", "quality": 80, "method": 4}),
+}
+DEFAULT_WORKERS = 2
+
+_pool = None
+
+
+def derivative_key(storage_key, size, fmt):
+    base = os.path.splitext(storage_key)[0]
+    return f"{base}_{size}.{FORMATS[fmt][0]}"
+
+
+def make_derivatives(src_path):
+    """Write every size/format of one photo. Runs in a pool process."""
+    # imported here so web workers don't pay for Pillow until a photo arrives
+    from PIL import Image, ImageOps
+
+    base = os.path.splitext(src_path)[0]
+    with Image.open(src_path) as im:
+        # bake the EXIF rotation into the pixels, then drop the metadata with it
+        im = ImageOps.exif_transpose(im)
+        im = im.convert("RGB")
+        for size, bounds in SIZES.items():
+            resized = im.copy()
+            resized.thumbnail(bounds, Image.LANCZOS)
+            for ext, save_args in FORMATS.values():
+                dest = f"{base}_{size}.{ext}"
+                tmp = f"{dest}.tmp"
+                resized.save(tmp, **save_args)
+                os.replace(tmp, dest)
+
+
+def _log_failure(future):
+    error = future.exception()
+    if error is not None:
+        log.warning("photo derivatives failed: %s", error)
+
+
+def _get_pool(max_workers):
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=max_workers)
+    return _pool
+
+
+def _discard_pool(pool):
+    global _pool
+    if _pool is pool:
+        _pool = None
+    pool.shutdown(wait=False)
+
+
+def schedule_derivatives(upload, max_workers=DEFAULT_WORKERS):
+    """Queue derivative generation for a stored upload; returns the Future, or
+    None when the derivatives already exist (a deduplicated photo) or the pool
+    could not take the job."""
+    # the review webp is written last, so it existing means the set is complete
+    if os.path.exists(derivative_path(upload, "review", "webp")):
+        return None
+    # runs after the consultation committed, so it must not fail the request
+    for _ in range(2):
+        pool = _get_pool(max_workers)
+        try:
+            future = pool.submit(make_derivatives, upload_path(upload))
+        except BrokenProcessPool:
+            # a pool process died (OOM kill, segfault); retry once on a fresh pool
+            _discard_pool(pool)
+            continue
+        future.add_done_callback(_log_failure)
+        return future
+    log.warning("photo derivatives not scheduled: the pool keeps breaking")
+    return None
+
+
+def derivative_path(upload, size, fmt):
+    return os.path.join(upload_root(), derivative_key(upload.storage_key, size, fmt))
+
+
+def derivative_urls(upload):
+    """{"thumbnail": {"jpeg": ..., "webp": ...}, "review": {...}} for ready sizes."""
+    urls = {}
+    for size in SIZES:
+        if os.path.exists(derivative_path(upload, size, "webp")):
+            urls[size] = {
+                fmt: f"{PUBLIC_PREFIX}/{derivative_key(upload.storage_key, size, fmt)}"
+                for fmt in FORMATS
+            }
+    return urls
+
+
+def shutdown_pool(wait=True):
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=wait)
+        _pool = None
+
+
+atexit.register(shutdown_pool)
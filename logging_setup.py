@@ -0,0 +1,50 @@
+"""Non-blocking structured logging.
+
+Every record goes through a QueueHandler; a single QueueListener thread formats
+it as one JSON line and writes it to stderr, so request workers never block on
+the log stream.
+"""
+import atexit
+import json
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level="INFO", sql_echo=False):
+    """Route the root logger through the queue. Safe to call once per app.
+
+    sql_echo logs every SQL statement (the sqlalchemy.engine logger at INFO).
+    """
+    global _listener
+    root = logging.getLogger()
+    root.setLevel(level)
+    if sql_echo:
+        logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
+    if _listener is not None:
+        return
+
+    log_queue = queue.SimpleQueue()
+    stream = logging.StreamHandler(sys.stderr)
+    stream.setFormatter(JsonFormatter())
+    _listener = QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    root.addHandler(QueueHandler(log_queue))
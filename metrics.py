@@ -0,0 +1,177 @@
+"""Per-endpoint request metrics.
+
+SQLAlchemy cursor events and Flask request signals feed prometheus_client
+metrics:
+
+* request latency histogram per endpoint and method
+* SQL statement count and SQL time per endpoint
+* Mailgun call latency, observed by the outbox worker (outbox.drain_outbox)
+
+They are served on /metrics in the Prometheus text format, and every response
+carries a Server-Timing header with that request's SQL time. Under gunicorn
+(gunicorn.conf.py sets PROMETHEUS_MULTIPROC_DIR) every process writes its
+values to a file in that directory and /metrics sums them, so a scrape sees
+the whole service rather than whichever worker answered. An outbox worker on
+the same host can share the directory; elsewhere it serves its own metrics on
+OUTBOX_METRICS_PORT (see serve_metrics). Set SLOW_QUERY_MS to log statements
+slower than that, with the endpoint and the shape (not the values) of their
+parameters.
+"""
+import logging
+import os
+import time
+
+from flask import current_app, g, has_app_context, has_request_context, request, request_finished, request_started
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    disable_created_metrics,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+from sqlalchemy import event
+
+from models import db
+
+log = logging.getLogger(__name__)
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+disable_created_metrics()  # no *_created series next to every counter
+
+
+def _multiprocess_dir():
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+
+def reset_metrics():
+    """(Re)create every metric with zero values; also used by tests."""
+    global _registry, _latency, _sql_statements, _sql_seconds, _mailgun
+    _registry = CollectorRegistry()
+    labels = ("endpoint", "method")
+    _latency = Histogram("dermhub_request_duration_seconds", "Request latency by endpoint.",
+                         labels, buckets=BUCKETS, registry=_registry)
+    _sql_statements = Counter("dermhub_request_sql_statements", "SQL statements run while serving the endpoint.",
+                              labels, registry=_registry)
+    _sql_seconds = Counter("dermhub_request_sql_seconds", "Time spent in SQL while serving the endpoint.",
+                           labels, registry=_registry)
+    _mailgun = Histogram("dermhub_mailgun_request_duration_seconds", "Mailgun API call latency.",
+                         buckets=BUCKETS, registry=_registry)
+
+
+reset_metrics()
+
+
+def _endpoint():
+    rule = request.url_rule
+    return rule.rule if rule is not None else "unmatched"
+
+
+def _request_metrics():
+    if has_request_context():
+        return g.get("_metrics")
+    return None
+
+
+# ------------------------
+# SQL
+# ------------------------
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _param_shape(parameters):
+    if isinstance(parameters, (list, tuple)) and parameters and isinstance(parameters[0], (list, tuple, dict)):
+        return f"{len(parameters)} x {_param_shape(parameters[0])}"
+    if isinstance(parameters, dict):
+        return {k: type(v).__name__ for k, v in parameters.items()}
+    return [type(v).__name__ for v in parameters or ()]
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+
+    metrics = _request_metrics()
+    if metrics is not None:
+        metrics["sql_statements"] += 1
+        metrics["sql_seconds"] += elapsed
+
+    if not has_app_context():
+        return
+    slow_ms = current_app.config.get("SLOW_QUERY_MS")
+    if slow_ms is not None and elapsed * 1000 >= slow_ms:
+        log.warning("slow query", extra={"fields": {
+            "ms": round(elapsed * 1000, 2),
+            "endpoint": _endpoint() if has_request_context() else None,
+            "statement": statement,
+            "params": _param_shape(parameters),
+        }})
+
+
+# ------------------------
+# external calls
+# ------------------------
+def observe_mailgun(seconds):
+    _mailgun.observe(seconds)
+
+
+# ------------------------
+# requests
+# ------------------------
+def _request_started(sender, **extra):
+    g._metrics = {
+        "start": time.perf_counter(),
+        "sql_statements": 0,
+        "sql_seconds": 0.0,
+    }
+
+
+def _request_finished(sender, response, **extra):
+    metrics = g.pop("_metrics", None)
+    if metrics is None:
+        return
+    elapsed = time.perf_counter() - metrics["start"]
+    labels = (_endpoint(), request.method)
+    _latency.labels(*labels).observe(elapsed)
+    _sql_statements.labels(*labels).inc(metrics["sql_statements"])
+    _sql_seconds.labels(*labels).inc(metrics["sql_seconds"])
+
+    response.headers["Server-Timing"] = (
+        f'db;dur={metrics["sql_seconds"] * 1000:.2f};desc="{metrics["sql_statements"]} queries", '
+        f'app;dur={elapsed * 1000:.2f}'
+    )
+
+
+def init_metrics(app):
+    with app.app_context():
+        engine = db.engine
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    request_started.connect(_request_started, app)
+    request_finished.connect(_request_finished, app)
+
+
+# ------------------------
+# exposition
+# ------------------------
+def _collecting_registry():
+    if _multiprocess_dir():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return _registry
+
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format, summed over processes."""
+    return generate_latest(_collecting_registry())
+
+
+def serve_metrics(port):
+    """Serve /metrics from a background thread, for processes without Flask routes."""
+    start_http_server(port, registry=_collecting_registry())
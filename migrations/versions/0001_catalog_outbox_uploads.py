@@ -0,0 +1,70 @@
+"""catalog version, email outbox and content-addressed uploads
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-17 17:40:00
+
+The schema before this revision was created with db.create_all(), so existing
+databases may already have some of these tables from a later seed run.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+
+    if "catalog_version" not in tables:
+        op.create_table(
+            "catalog_version",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("version", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        )
+
+    if "email_outbox" not in tables:
+        op.create_table(
+            "email_outbox",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("idempotency_key", sa.String(length=120), nullable=False, unique=True),
+            sa.Column("to_email", sa.String(length=255), nullable=False),
+            sa.Column("subject", sa.String(length=255), nullable=False),
+            sa.Column("body", sa.Text(), nullable=False),
+            sa.Column("status", sa.String(length=20), nullable=False),
+            sa.Column("attempts", sa.Integer(), nullable=False),
+            sa.Column("next_attempt_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+            sa.Column("last_error", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+            sa.Column("sent_at", sa.DateTime(timezone=True), nullable=True),
+        )
+        op.create_index("ix_email_outbox_status", "email_outbox", ["status"])
+
+    if "uploads" not in tables:
+        op.create_table(
+            "uploads",
+            sa.Column("sha256", sa.String(length=64), primary_key=True),
+            sa.Column("extension", sa.String(length=10), nullable=False),
+            sa.Column("size_bytes", sa.Integer(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        )
+
+    if "photo_sha256" not in [c["name"] for c in inspector.get_columns("consultations")]:
+        op.add_column("consultations", sa.Column("photo_sha256", sa.String(length=64), nullable=True))
+        op.create_foreign_key("consultations_photo_sha256_fkey", "consultations", "uploads",
+                              ["photo_sha256"], ["sha256"])
+
+
+def downgrade():
+    op.drop_constraint("consultations_photo_sha256_fkey", "consultations", type_="foreignkey")
+    op.drop_column("consultations", "photo_sha256")
+    op.drop_table("uploads")
+    op.drop_index("ix_email_outbox_status", table_name="email_outbox")
+    op.drop_table("email_outbox")
+    op.drop_table("catalog_version")
@@ -0,0 +1,43 @@
+"""ON DELETE CASCADE for question, follow-up and consultation children
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 17:45:00
+
+Deleting a primary question removes its follow-ups, every answer to either,
+and the consultations opened with it; deleting a consultation removes its
+answers. Constraint names are the Postgres defaults db.create_all() produced.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+# (table, column, referenced table)
+CASCADES = [
+    ("followup_questions", "parent_question_id", "consult_questions"),
+    ("followup_answers", "question_id", "followup_questions"),
+    ("followup_answers", "consultation_id", "consultations"),
+    ("consult_answers", "question_id", "consult_questions"),
+    ("consult_answers", "consultation_id", "consultations"),
+    ("consultations", "primary_question_id", "consult_questions"),
+]
+
+
+def _recreate(ondelete):
+    for table, column, referent in CASCADES:
+        name = f"{table}_{column}_fkey"
+        op.drop_constraint(name, table, type_="foreignkey")
+        op.create_foreign_key(name, table, referent, [column], ["id"], ondelete=ondelete)
+
+
+def upgrade():
+    _recreate("CASCADE")
+
+
+def downgrade():
+    _recreate(None)
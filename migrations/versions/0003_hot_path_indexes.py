@@ -0,0 +1,42 @@
+"""indexes for the dashboard, follow-up flow, admin detail and delete paths
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 18:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns)
+INDEXES = [
+    ("ix_consultations_user_id_id", "consultations", ["user_id", sa.text("id DESC")]),
+    ("ix_consultations_status_id", "consultations", ["status", "id"]),
+    ("ix_consultations_primary_question_id", "consultations", ["primary_question_id"]),
+    ("ix_followup_answers_consultation_id", "followup_answers", ["consultation_id"]),
+    ("ix_followup_answers_question_id", "followup_answers", ["question_id"]),
+    ("ix_followup_questions_parent_question_id", "followup_questions", ["parent_question_id"]),
+    ("ix_consult_answers_consultation_id", "consult_answers", ["consultation_id"]),
+    ("ix_consult_answers_question_id", "consult_answers", ["question_id"]),
+]
+
+
+def upgrade():
+    # a later seed run (db.create_all()) may already have created some of them
+    inspector = sa.inspect(op.get_bind())
+    existing = {table: {i["name"] for i in inspector.get_indexes(table)} for table in {t for _, t, _ in INDEXES}}
+    for name, table, columns in INDEXES:
+        if name not in existing[table]:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,74 @@
+"""consultation_summaries read model for the admin list, backfilled from consultations
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 19:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # a later seed run (db.create_all()) may already have created it, but empty
+    if "consultation_summaries" not in sa.inspect(op.get_bind()).get_table_names():
+        _create_table()
+    _backfill()
+
+
+def _create_table():
+    op.create_table(
+        "consultation_summaries",
+        sa.Column("consultation_id", sa.Integer(),
+                  sa.ForeignKey("consultations.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("form_id", sa.Integer(), nullable=False),
+        sa.Column("primary_question_id", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=True),
+        sa.Column("first_name", sa.String(length=120), nullable=True),
+        sa.Column("last_name", sa.String(length=120), nullable=True),
+        sa.Column("primary_prompt", sa.String(length=255), nullable=True),
+        sa.Column("answer_count", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column("followup_answer_count", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column("photo_count", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index("ix_consultation_summaries_status_id", "consultation_summaries", ["status", "consultation_id"])
+    op.create_index("ix_consultation_summaries_user_id_id", "consultation_summaries", ["user_id", "consultation_id"])
+
+
+
+def _backfill():
+    # a table from db.create_all() has the current columns, without primary_prompt (see 0008)
+    columns = [c["name"] for c in sa.inspect(op.get_bind()).get_columns("consultation_summaries")]
+    prompt = "primary_prompt" in columns
+    op.execute(f"""
+        INSERT INTO consultation_summaries (
+            consultation_id, user_id, form_id, primary_question_id, status, first_name, last_name,
+            {"primary_prompt, " if prompt else ""}answer_count, followup_answer_count, photo_count, updated_at
+        )
+        SELECT c.id, c.user_id, c.form_id, c.primary_question_id, c.status, u.first_name, u.last_name,
+               {"q.prompt, " if prompt else ""}
+               (SELECT count(*) FROM consult_answers a WHERE a.consultation_id = c.id),
+               (SELECT count(*) FROM followup_answers f WHERE f.consultation_id = c.id),
+               CASE WHEN c.photo_sha256 IS NOT NULL THEN 1 ELSE 0 END
+               + (SELECT count(DISTINCT f.file_path) FROM followup_answers f WHERE f.consultation_id = c.id),
+               CURRENT_TIMESTAMP
+        FROM consultations c
+        LEFT OUTER JOIN users u ON c.user_id = u.id
+        LEFT OUTER JOIN consult_questions q ON c.primary_question_id = q.id
+        WHERE NOT EXISTS (SELECT 1 FROM consultation_summaries s WHERE s.consultation_id = c.id)
+    """)
+
+
+def downgrade():
+    op.drop_index("ix_consultation_summaries_user_id_id", table_name="consultation_summaries")
+    op.drop_index("ix_consultation_summaries_status_id", table_name="consultation_summaries")
+    op.drop_table("consultation_summaries")
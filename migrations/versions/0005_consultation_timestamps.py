@@ -0,0 +1,36 @@
+"""consultation created_at / submitted_at for /api/stats
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 19:30:00
+
+Existing rows get created_at = time of the upgrade; submitted_at stays NULL
+for them because the submission time was never recorded.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # a later seed run (db.create_all()) may already have added them
+    inspector = sa.inspect(op.get_bind())
+    if "created_at" in [c["name"] for c in inspector.get_columns("consultations")]:
+        return
+
+    op.add_column("consultations", sa.Column("created_at", sa.DateTime(timezone=True),
+                                             nullable=False, server_default=sa.func.now()))
+    op.add_column("consultations", sa.Column("submitted_at", sa.DateTime(timezone=True), nullable=True))
+    op.create_index("ix_consultations_submitted_at", "consultations", ["submitted_at"])
+
+
+def downgrade():
+    op.drop_index("ix_consultations_submitted_at", table_name="consultations")
+    op.drop_column("consultations", "submitted_at")
+    op.drop_column("consultations", "created_at")
@@ -0,0 +1,36 @@
+"""consultation_events change feed for /api/consultations/stream
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 20:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # a later seed run (db.create_all()) may already have created it
+    if "consultation_events" in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table(
+        "consultation_events",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("consultation_id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(length=20), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index("ix_consultation_events_created_at", "consultation_events", ["created_at"])
+
+
+def downgrade():
+    op.drop_index("ix_consultation_events_created_at", table_name="consultation_events")
+    op.drop_table("consultation_events")
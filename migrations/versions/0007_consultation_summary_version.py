@@ -0,0 +1,30 @@
+"""consultation_summaries.version, restamped on every refresh and used in ETags
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 20:30:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # a later seed run (db.create_all()) may already have added it
+    inspector = sa.inspect(op.get_bind())
+    if "version" in [c["name"] for c in inspector.get_columns("consultation_summaries")]:
+        return
+
+    op.add_column("consultation_summaries",
+                  sa.Column("version", sa.BigInteger(), nullable=False, server_default=sa.text("0")))
+
+
+def downgrade():
+    op.drop_column("consultation_summaries", "version")
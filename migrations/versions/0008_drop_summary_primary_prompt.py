@@ -0,0 +1,34 @@
+"""drop consultation_summaries.primary_prompt; the admin list reads it from the catalog
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 21:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # absent when a later seed run (db.create_all()) created the table
+    inspector = sa.inspect(op.get_bind())
+    if "primary_prompt" not in [c["name"] for c in inspector.get_columns("consultation_summaries")]:
+        return
+
+    op.drop_column("consultation_summaries", "primary_prompt")
+
+
+def downgrade():
+    op.add_column("consultation_summaries", sa.Column("primary_prompt", sa.String(length=255), nullable=True))
+    op.execute("""
+        UPDATE consultation_summaries SET primary_prompt = (
+            SELECT q.prompt FROM consult_questions q WHERE q.id = consultation_summaries.primary_question_id
+        )
+    """)
@@ -1,11 +1,24 @@
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
 from sqlalchemy.sql import func
 from sqlalchemy import text
 from sqlalchemy.orm import synonym
 from flask_bcrypt import Bcrypt
+from passwords import check_password, hash_password, needs_rehash
+
+class BindableSession(Session):
+    """Flask-SQLAlchemy session that honours an explicit bind, so tests can join
+    every session to one outer transaction."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.bind is not None:
+            return self.bind
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
 
 bcrypt = Bcrypt()
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": BindableSession})
 
 class User(db.Model):
     __tablename__ = "users"
@@ -24,7 +37,7 @@ class User(db.Model):
 
     @classmethod
     def signup(cls, username, email, password, first_name=None, last_name=None):
-        hashed_pwd = bcrypt.generate_password_hash(password).decode("utf-8")
+        hashed_pwd = hash_password(password)
         user = cls(
             username=username,
             email=email,
@@ -37,24 +50,38 @@ class User(db.Model):
 
     @classmethod
     def authenticate(cls, username, password):
+        """Return the user if the password matches, else False.
+
+        A hash made with an old cost factor is replaced; the caller commits it."""
         user = cls.query.filter_by(username=username).first()
-        if user and bcrypt.check_password_hash(user.password_hashed, password):
+        if user and check_password(user.password_hashed, password):
+            if needs_rehash(user.password_hashed):
+                user.password_hashed = hash_password(password)
             return user
         return False
 
 
 class Consultation(db.Model):
     __tablename__ = "consultations"
+    __table_args__ = (
+        db.Index("ix_consultations_user_id_id", "user_id", db.text("id DESC")),  # dashboard, newest first
+        db.Index("ix_consultations_status_id", "status", "id"),  # admin list filtered by status, keyset on id
+        db.Index("ix_consultations_submitted_at", "submitted_at"),  # /api/stats date buckets
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)    
     form_id = db.Column(db.Integer, db.ForeignKey("consult_forms.id"), nullable=False)
-    primary_question_id = db.Column(db.Integer, db.ForeignKey("consult_questions.id"), nullable=False)
-    status = db.Column(db.String(20), default="draft")
+    primary_question_id = db.Column(db.Integer, db.ForeignKey("consult_questions.id", ondelete="CASCADE"), nullable=False, index=True)
+    status = db.Column(db.String(20), default="draft")  # see review.STATUS_TRANSITIONS
+    photo_sha256 = db.Column(db.String(64), db.ForeignKey("uploads.sha256"), nullable=True)
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=func.now())
+    submitted_at = db.Column(db.DateTime(timezone=True), nullable=True)
 
     user = db.relationship("User",backref="consultations")
-    answers = db.relationship("ConsultAnswer",backref="consultation")
-    followup_answers = db.relationship("FollowupAnswers",backref="consultation")
+    answers = db.relationship("ConsultAnswer",backref="consultation", passive_deletes=True)
+    followup_answers = db.relationship("FollowupAnswers",backref="consultation", passive_deletes=True)
     primary_question = db.relationship("ConsultQuestion")
+    photo = db.relationship("Upload")
 
 class ConsultForm(db.Model):
     __tablename__ = "consult_forms"
@@ -71,7 +98,7 @@ class ConsultQuestion(db.Model):
     prompt = db.Column(db.String(255), nullable=False)
 
     form_id = db.Column(db.Integer, db.ForeignKey("consult_forms.id"), nullable=False)
-    followups = db.relationship("FollowupQuestions",backref="parent_question")
+    followups = db.relationship("FollowupQuestions",backref="parent_question", passive_deletes=True)
 
     def to_dict(self):  ## turning SQLAlcgemy into python dict and adding followupquestions 
         return {
@@ -87,7 +114,7 @@ class FollowupQuestions(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     prompt = db.Column(db.String(255), nullable=False)
-    parent_question_id = db.Column(db.Integer,db.ForeignKey("consult_questions.id"), nullable=False)
+    parent_question_id = db.Column(db.Integer,db.ForeignKey("consult_questions.id", ondelete="CASCADE"), nullable=False, index=True)
     
     def to_dict(self): ## turning SQLAQlchemy into python dict
         return {
@@ -96,13 +123,19 @@ class FollowupQuestions(db.Model):
               "parent_question_id": self.parent_question_id
         }
 
+class CatalogVersion(db.Model):
+    """Single row (id=1) counting edits to forms/questions/follow-ups; see catalog.py."""
+    __tablename__ = "catalog_version"
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default=text("0"))
+
 class ConsultAnswer(db.Model):
     __tablename__ = "consult_answers"
     id = db.Column(db.Integer, primary_key=True)
 
-    consultation_id = db.Column(db.Integer, db.ForeignKey("consultations.id"), nullable=False)
+    consultation_id = db.Column(db.Integer, db.ForeignKey("consultations.id", ondelete="CASCADE"), nullable=False, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"),nullable=True)
-    question_id = db.Column(db.Integer,db.ForeignKey("consult_questions.id"),nullable=False)
+    question_id = db.Column(db.Integer,db.ForeignKey("consult_questions.id", ondelete="CASCADE"),nullable=False, index=True)
     answer_text = db.Column(db.Text,nullable=True)
 
     question = db.relationship("ConsultQuestion")
@@ -110,24 +143,98 @@ class ConsultAnswer(db.Model):
 class FollowupAnswers(db.Model):
     __tablename__ = "followup_answers"
     id = db.Column(db.Integer, primary_key=True)
-    consultation_id = db.Column(db.Integer, db.ForeignKey("consultations.id"), nullable=False)
-    question_id = db.Column(db.Integer, db.ForeignKey("followup_questions.id"), nullable=False)
+    consultation_id = db.Column(db.Integer, db.ForeignKey("consultations.id", ondelete="CASCADE"), nullable=False, index=True)
+    question_id = db.Column(db.Integer, db.ForeignKey("followup_questions.id", ondelete="CASCADE"), nullable=False, index=True)
     text_answer = db.Column(db.Text, nullable=True)
-    file_path = db.Column(db.String(500), nullable=True)  #storing the file path of the picture
+    file_path = db.Column(db.String(500), nullable=True)  # legacy uploads; new photos live on Consultation.photo
 
    
     question = db.relationship("FollowupQuestions")
 
 
+class ConsultationSummary(db.Model):
+    """One row per consultation with everything the admin list shows; see summaries.py."""
+    __tablename__ = "consultation_summaries"
+    __table_args__ = (
+        db.Index("ix_consultation_summaries_status_id", "status", "consultation_id"),
+        db.Index("ix_consultation_summaries_user_id_id", "user_id", "consultation_id"),
+    )
+    consultation_id = db.Column(db.Integer, db.ForeignKey("consultations.id", ondelete="CASCADE"), primary_key=True)
+    user_id = db.Column(db.Integer, nullable=True)
+    form_id = db.Column(db.Integer, nullable=False)
+    primary_question_id = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), nullable=True)
+    first_name = db.Column(db.String(120), nullable=True)
+    last_name = db.Column(db.String(120), nullable=True)
+    answer_count = db.Column(db.Integer, nullable=False, default=0, server_default=text("0"))
+    followup_answer_count = db.Column(db.Integer, nullable=False, default=0, server_default=text("0"))
+    photo_count = db.Column(db.Integer, nullable=False, default=0, server_default=text("0"))
+    version = db.Column(db.BigInteger, nullable=False, server_default=text("0"))  # changes on every refresh; ETags
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=func.now())
+
+class ConsultationEvent(db.Model):
+    """Append-only change feed for the admin app; see events.py."""
+    __tablename__ = "consultation_events"
+    id = db.Column(db.Integer, primary_key=True)
+    consultation_id = db.Column(db.Integer, nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # created / submitted / status
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
+
+class Upload(db.Model):
+    """A stored photo, addressed by the SHA-256 of its bytes; see uploads.py."""
+    __tablename__ = "uploads"
+    sha256 = db.Column(db.String(64), primary_key=True)
+    extension = db.Column(db.String(10), nullable=False)
+    size_bytes = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    @property
+    def storage_key(self):
+        return f"{self.sha256[:2]}/{self.sha256[2:4]}/{self.sha256}{self.extension}"
+
+
+class EmailOutbox(db.Model):
+    """Emails waiting to be sent. Rows are written in the same transaction as the
+    data they announce and drained by outbox.py running in its own process."""
+    __tablename__ = "email_outbox"
+    id = db.Column(db.Integer, primary_key=True)
+    idempotency_key = db.Column(db.String(120), nullable=False, unique=True)
+    to_email = db.Column(db.String(255), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="pending", index=True)  # pending / sent / failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=func.now())
+    sent_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+
+
+
+
+
 
 
 
 
+def _sqlite_connect(dbapi_connection, connection_record):
+    # let SQLAlchemy emit BEGIN itself so SAVEPOINTs work, and enforce FKs like Postgres
+    dbapi_connection.isolation_level = None
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
 
 
+def _sqlite_begin(conn):
+    conn.exec_driver_sql("BEGIN")
 
 
 def connect_db(app):
     db.app=app
     db.init_app(app)
+    if app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+        with app.app_context():
+            event.listen(db.engine, "connect", _sqlite_connect)
+            event.listen(db.engine, "begin", _sqlite_begin)
 
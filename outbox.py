@@ -0,0 +1,127 @@
+"""Transactional email outbox.
+
+Request handlers call enqueue_email() (enqueue_emails() for a batch) before
+their commit, so an email is only recorded if the data it announces is. A
+separate process (`python outbox.py`) drains pending rows in batches over one
+pooled requests.Session and retries failed sends with exponential backoff until
+MAX_ATTEMPTS.
+"""
+import time
+from datetime import datetime, timedelta, timezone
+
+from metrics import observe_mailgun, serve_metrics
+from models import db, EmailOutbox
+
+BATCH_SIZE = 20
+MAX_ATTEMPTS = 8
+BASE_BACKOFF = 30  # seconds, doubled after every failed attempt
+MAX_BACKOFF = 60 * 60
+POLL_INTERVAL = 2  # seconds to sleep when there is nothing to send
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def backoff(attempts):
+    return timedelta(seconds=min(BASE_BACKOFF * 2 ** (attempts - 1), MAX_BACKOFF))
+
+
+def enqueue_email(to_email, subject, text, idempotency_key):
+    """Queue an email inside the current transaction.
+
+    A key that is already queued is ignored, so a resubmitted form sends one email.
+    """
+    existing = db.session.execute(
+        db.select(EmailOutbox.id).where(EmailOutbox.idempotency_key == idempotency_key)
+    ).first()
+    if existing:
+        return None
+
+    msg = EmailOutbox(
+        idempotency_key=idempotency_key,
+        to_email=to_email,
+        subject=subject,
+        body=text,
+    )
+    db.session.add(msg)
+    return msg
+
+
+def enqueue_emails(messages):
+    """enqueue_email() for many messages (dicts of its arguments) in one INSERT."""
+    keys = [m["idempotency_key"] for m in messages]
+    existing = set(db.session.execute(
+        db.select(EmailOutbox.idempotency_key).where(EmailOutbox.idempotency_key.in_(keys))
+    ).scalars()) if keys else set()
+    new = {m["idempotency_key"]: m for m in messages if m["idempotency_key"] not in existing}
+    if new:
+        db.session.execute(db.insert(EmailOutbox), list(new.values()))
+    return len(new)
+
+
+def drain_outbox(send_email, http=None, batch_size=BATCH_SIZE):
+    """Send one batch of due emails and return how many rows were picked up.
+
+    Rows are locked with SKIP LOCKED so several workers can drain side by side.
+    """
+    import requests
+
+    now = _now()
+    batch = db.session.execute(
+        db.select(EmailOutbox)
+        .where(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now)
+        .order_by(EmailOutbox.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+
+    for msg in batch:
+        msg.attempts += 1
+        start = time.perf_counter()
+        try:
+            ok, detail = send_email(
+                msg.to_email,
+                msg.subject,
+                msg.body,
+                http=http,
+                idempotency_key=msg.idempotency_key,
+            )
+        except requests.RequestException as e:
+            ok, detail = False, str(e)
+        finally:
+            observe_mailgun(time.perf_counter() - start)
+
+        if ok:
+            msg.status = "sent"
+            msg.sent_at = _now()
+            msg.last_error = None
+        else:
+            msg.last_error = (detail or "")[:1000]
+            if msg.attempts >= MAX_ATTEMPTS:
+                msg.status = "failed"
+            else:
+                msg.next_attempt_at = now + backoff(msg.attempts)
+
+    db.session.commit()
+    return len(batch)
+
+
+def run_worker(app, send_email, poll_interval=POLL_INTERVAL):
+    """Drain the outbox forever, reusing one HTTP connection pool."""
+    import requests
+
+    http = requests.Session()
+    with app.app_context():
+        while True:
+            if drain_outbox(send_email, http=http) == 0:
+                time.sleep(poll_interval)
+
+
+if __name__ == "__main__":
+    from app import app, mailgun_settings, send_mailgun_email
+
+    mailgun_settings(app.config)  # fail at startup, not on the first email
+    if app.config.get("OUTBOX_METRICS_PORT"):
+        serve_metrics(app.config["OUTBOX_METRICS_PORT"])
+    run_worker(app, send_mailgun_email)
@@ -0,0 +1,177 @@
+"""Password hashing off the request worker, and login throttling.
+
+bcrypt runs in a small process pool so a burst of logins can't pin every
+request worker. At most PASSWORD_MAX_PENDING hashes may be queued or running;
+beyond that callers get PasswordHashingBusy straight away instead of waiting.
+If a pool process dies, the callers caught by it get PasswordHashingBusy too
+and the next call starts a fresh pool.
+
+Login attempts are counted per worker: per client IP (every attempt) and per
+username (failures only) over LOGIN_THROTTLE_WINDOW seconds. Going over either
+limit raises TooManyAttempts before any hashing happens.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+from flask import current_app
+
+DEFAULT_LOG_ROUNDS = 12
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_PENDING = 8
+DEFAULT_TIMEOUT = 10  # seconds to wait for a hash before giving up
+
+DEFAULT_ATTEMPTS_PER_IP = 30
+DEFAULT_FAILURES_PER_USERNAME = 10
+DEFAULT_THROTTLE_WINDOW = 300  # seconds
+
+
+class PasswordHashingBusy(RuntimeError):
+    """Raised when the hashing pool is saturated; answer 503."""
+
+
+class TooManyAttempts(Exception):
+    """Raised when a client or username is over its login attempt limit; answer 429."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Too many login attempts, try again in {retry_after} seconds")
+        self.retry_after = retry_after
+
+
+# ------------------------
+# hashing pool
+# ------------------------
+_pool = None
+_pool_lock = threading.Lock()
+_slots = None
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def _check(hashed, password):
+    return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+
+
+def _submit(fn, *args):
+    global _pool, _slots
+    config = current_app.config
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=config.get("PASSWORD_WORKERS", DEFAULT_WORKERS))
+            _slots = threading.BoundedSemaphore(config.get("PASSWORD_MAX_PENDING", DEFAULT_MAX_PENDING))
+        pool, slots = _pool, _slots
+
+    if not slots.acquire(blocking=False):
+        raise PasswordHashingBusy("Password service is busy, try again shortly")
+    try:
+        future = pool.submit(fn, *args)
+    except BrokenProcessPool:
+        slots.release()
+        _discard_pool(pool)
+        raise PasswordHashingBusy("Password service is restarting, try again shortly")
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return future.result(timeout=config.get("PASSWORD_HASH_TIMEOUT", DEFAULT_TIMEOUT))
+    except TimeoutError:
+        raise PasswordHashingBusy("Password service is busy, try again shortly")
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        raise PasswordHashingBusy("Password service is restarting, try again shortly")
+
+
+def _discard_pool(pool):
+    """Drop a pool whose worker process died (OOM kill, segfault); a broken pool
+    refuses every later submit, so the next call starts a fresh one."""
+    global _pool, _slots
+    with _pool_lock:
+        if _pool is pool:
+            _pool = _slots = None
+    pool.shutdown(wait=False)
+
+
+def log_rounds():
+    return current_app.config.get("BCRYPT_LOG_ROUNDS", DEFAULT_LOG_ROUNDS)
+
+
+def hash_password(password):
+    return _submit(_hash, password, log_rounds())
+
+
+def check_password(hashed, password):
+    return _submit(_check, hashed, password)
+
+
+def needs_rehash(hashed):
+    """True when hashed was made with a different cost factor than the configured one."""
+    try:
+        return int(hashed.split("$")[2]) != log_rounds()
+    except (IndexError, ValueError):
+        return True
+
+
+def shutdown_pool():
+    global _pool, _slots
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+        _pool = _slots = None
+
+
+# ------------------------
+# login throttling
+# ------------------------
+_throttle_lock = threading.Lock()
+_attempts = {}  # ("ip", addr) / ("user", name) -> deque of monotonic timestamps
+
+
+def _recent(key, now, window):
+    hits = _attempts.setdefault(key, deque())
+    while hits and hits[0] <= now - window:
+        hits.popleft()
+    return hits
+
+
+def _prune(now, window):
+    for key in [k for k, hits in _attempts.items() if not hits or hits[-1] <= now - window]:
+        del _attempts[key]
+
+
+def check_login_allowed(username, ip):
+    """Count an attempt from ip; raise TooManyAttempts if ip or username is over its limit."""
+    config = current_app.config
+    window = config.get("LOGIN_THROTTLE_WINDOW", DEFAULT_THROTTLE_WINDOW)
+    now = time.monotonic()
+    with _throttle_lock:
+        if len(_attempts) > 10000:
+            _prune(now, window)
+        by_ip = _recent(("ip", ip), now, window)
+        by_user = _recent(("user", username.lower()), now, window)
+        for hits, limit in (
+            (by_ip, config.get("LOGIN_ATTEMPTS_PER_IP", DEFAULT_ATTEMPTS_PER_IP)),
+            (by_user, config.get("LOGIN_FAILURES_PER_USERNAME", DEFAULT_FAILURES_PER_USERNAME)),
+        ):
+            if len(hits) >= limit:
+                raise TooManyAttempts(max(1, int(hits[0] + window - now) + 1))
+        by_ip.append(now)
+
+
+def record_login_failure(username):
+    now = time.monotonic()
+    with _throttle_lock:
+        _attempts.setdefault(("user", username.lower()), deque()).append(now)
+
+
+def record_login_success(username):
+    with _throttle_lock:
+        _attempts.pop(("user", username.lower()), None)
+
+
+def clear_login_throttle():
+    """Forget every counted attempt (used by tests)."""
+    with _throttle_lock:
+        _attempts.clear()
@@ -0,0 +1,130 @@
+"""JSON encoding and compression of responses.
+
+jsonify() goes through the provider named by JSON_PROVIDER: "orjson" (the
+default when the package is installed) encodes straight to bytes in C, with the
+same key order and the same handling of dates and other extra types as Flask's
+"default" provider.
+
+Compressible responses of at least COMPRESS_MIN_BYTES are gzip (or brotli, when
+that package is installed) encoded for clients that accept it. A compressed
+body is a different representation, so its strong ETag gets an encoding suffix
+and matching_etag() accepts either form on revalidation. Streamed responses
+(server-sent events, exports) are left alone.
+"""
+import gzip
+
+from flask import current_app, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - the stdlib encoder is used instead
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+DEFAULT_COMPRESS_MIN_BYTES = 1024
+DEFAULT_COMPRESS_LEVEL = 6
+BROTLI_QUALITY = 5  # close to gzip -6 in CPU, noticeably smaller
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "text/csv",
+    "text/html",
+    "text/plain",
+}
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """DefaultJSONProvider output, encoded by orjson."""
+
+    def _options(self, indent=False, sort_keys=None):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if self.sort_keys if sort_keys is None else sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    # callers passing json.dumps/loads options orjson has no equivalent for (the
+    # session serializer's object_hook, for one) get the stdlib encoder
+    def dumps(self, obj, **kwargs):
+        if set(kwargs) - {"indent", "separators", "sort_keys"}:
+            return super().dumps(obj, **kwargs)
+        option = self._options(kwargs.get("indent"), kwargs.get("sort_keys"))
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=self.default, option=self._options(indent))
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+
+JSON_PROVIDERS = {"default": DefaultJSONProvider}
+if orjson is not None:
+    JSON_PROVIDERS["orjson"] = OrjsonProvider
+
+
+# ------------------------
+# compression
+# ------------------------
+def matching_etag(etag):
+    """The tag from If-None-Match naming a representation of etag, or None.
+
+    Compressed responses carry "<etag>-<encoding>", so a client revalidating a
+    gzip body sends that form back.
+    """
+    for tag in (etag, *(f"{etag}-{encoding}" for encoding in ENCODINGS)):
+        if request.if_none_match.contains(tag):
+            return tag
+    return None
+
+
+def _compress(data, encoding, level):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def compress_response(response):
+    if response.status_code not in (200, 304) or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add("Accept-Encoding")
+    if (
+        response.status_code != 200
+        or response.is_streamed
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+
+    data = response.get_data()
+    if len(data) < current_app.config.get("COMPRESS_MIN_BYTES", DEFAULT_COMPRESS_MIN_BYTES):
+        return response
+    encoding = request.accept_encodings.best_match(ENCODINGS)
+    if encoding is None:
+        return response
+
+    level = current_app.config.get("COMPRESS_LEVEL", DEFAULT_COMPRESS_LEVEL)
+    response.set_data(_compress(data, encoding, level))
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f"{etag}-{encoding}")
+    return response
+
+
+def init_responses(app):
+    name = app.config.get("JSON_PROVIDER") or "default"
+    app.json = JSON_PROVIDERS.get(name, DefaultJSONProvider)(app)
+    app.after_request(compress_response)
@@ -0,0 +1,99 @@
+"""Review states of a consultation and bulk moves between them.
+
+Patients create a draft and submit it; from there admins move it along
+STATUS_TRANSITIONS. When an admin asks for more information (needs_info), the
+patient answers again and the consultation goes back to in_review
+(PATIENT_TRANSITIONS). bulk_update_status() moves any number of consultations in
+one UPDATE ... RETURNING that only touches rows whose current status may go to
+the target, so rows in other states are skipped rather than failing the batch,
+and a retried request changes nothing twice. Patients are told about the
+states in NOTIFICATIONS through one multi-row insert into the email outbox.
+"""
+import time
+
+from models import db, Consultation, User
+from events import record_events
+from outbox import enqueue_emails
+from summaries import refresh_summaries
+
+STATUS_TRANSITIONS = {
+    "draft": ("closed",),
+    "submitted": ("in_review", "reviewed", "closed"),
+    "in_review": ("reviewed", "needs_info", "closed"),
+    "needs_info": ("in_review", "closed"),
+    "reviewed": ("closed",),
+    "closed": (),
+}
+STATUSES = tuple(STATUS_TRANSITIONS)
+# status a patient's follow-up submission moves a consultation to, by current status
+PATIENT_TRANSITIONS = {
+    "draft": "submitted",
+    "needs_info": "in_review",
+}
+
+NOTIFICATIONS = {
+    "reviewed": (
+        "Your DermHub consultation has been reviewed",
+        "A dermatologist has reviewed your consultation. You will receive their recommendations shortly.",
+    ),
+    "needs_info": (
+        "Your DermHub consultation needs more information",
+        "A dermatologist needs a little more information to review your consultation. Please sign in to DermHub and answer the follow-up questions again from your dashboard.",
+    ),
+}
+
+
+class InvalidTransition(ValueError):
+    pass
+
+
+def allowed_sources(target):
+    """Statuses a consultation can be moved to target from."""
+    if target not in STATUS_TRANSITIONS:
+        raise InvalidTransition(f"status must be one of {', '.join(STATUSES)}")
+    sources = [status for status, targets in STATUS_TRANSITIONS.items() if target in targets]
+    if not sources:
+        raise InvalidTransition(f"consultations cannot be moved to {target}")
+    return sources
+
+
+def check_transition(source, target):
+    """Reject a filter on a status that can never reach target, instead of matching nothing."""
+    allowed_sources(target)
+    if source in STATUS_TRANSITIONS and target not in STATUS_TRANSITIONS[source]:
+        raise InvalidTransition(f"consultations cannot be moved from {source} to {target}")
+
+
+def bulk_update_status(target, *where):
+    """Move every consultation matching where (and allowed to) to target; call
+    it just before commit. Returns the ids that changed, in id order."""
+    rows = db.session.execute(
+        db.update(Consultation)
+        .where(*where, Consultation.status.in_(allowed_sources(target)))
+        .values(status=target)
+        .returning(Consultation.id, Consultation.user_id),
+        execution_options={"synchronize_session": False},
+    ).all()
+    if not rows:
+        return []
+    ids = sorted(row.id for row in rows)
+
+    refresh_summaries(Consultation.id.in_(ids))
+    record_events(ids, "status")
+
+    if target in NOTIFICATIONS:
+        subject, text = NOTIFICATIONS[target]
+        emails = dict(db.session.execute(
+            db.select(User.id, User.email).where(User.id.in_({row.user_id for row in rows if row.user_id}))
+        ).all())
+        stamp = time.time_ns()  # a later move to the same status is a new email
+        enqueue_emails([
+            {
+                "to_email": emails[row.user_id],
+                "subject": subject,
+                "body": text,
+                "idempotency_key": f"consultation-{target}:{row.id}:{stamp}",
+            }
+            for row in rows if row.user_id in emails
+        ])
+    return ids
@@ -1,8 +1,30 @@
-from app import app
-from models import db, ConsultForm, ConsultQuestion, FollowupQuestions, User, bcrypt
+import csv
+import io
 import os
+import random
+from datetime import datetime, timedelta, timezone
 
-def run_seed():
+import bcrypt as _bcrypt
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from models import (
+    db, ConsultAnswer, Consultation, ConsultForm, ConsultQuestion, FollowupAnswers, FollowupQuestions, User, bcrypt,
+)
+from catalog import bump_catalog_version
+from passwords import log_rounds
+from summaries import refresh_summaries
+
+SYNTHETIC_PASSWORD = "Password1!"
+SYNTHETIC_BATCH_SIZE = 10000
+SYNTHETIC_DAYS = 90
+
+
+def run_seed(app=None):
+    if app is None:
+        from app import create_app
+        app = create_app()
 
     with app.app_context():
     # Only reset DB when you explicitly request it
@@ -47,6 +69,7 @@ def run_seed():
 
                 FollowupQuestions(prompt="Family history or recent stress/illness/meds?", parent_question_id=pq_hair.id),
             ])
+            bump_catalog_version()
 
         # ---- Admin user from env vars ----
         ADMIN_USERNAME = os.getenv("ADMIN_USERNAME", "kadmin")
@@ -82,5 +105,145 @@ def run_seed():
         db.session.commit()
         print("Seed completed successfully!")
         
+
+# ------------------------
+# synthetic data
+# ------------------------
+def synthetic_username(i):
+    return f"synthetic{i:07d}"
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _copy_rows(table, rows):
+    """COPY rows into table over the session's connection (Postgres only)."""
+    columns = list(rows[0])
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow([r"\N" if row[c] is None else row[c] for c in columns])
+    buf.seek(0)
+    cursor = db.session.connection().connection.driver_connection.cursor()
+    cursor.copy_expert(
+        f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buf
+    )
+
+
+def _bulk_insert(model, rows):
+    if not rows:
+        return
+    if db.engine.dialect.driver == "psycopg2":
+        _copy_rows(model.__table__, rows)
+    else:
+        db.session.execute(db.insert(model), rows)
+
+
+def seed_synthetic(users=0, consultations=0, seed=0, batch_size=SYNTHETIC_BATCH_SIZE, echo=print):
+    """Top synthetic users up to `users` and add `consultations` with their answers.
+
+    Runs inside an app context against the existing catalog. The same arguments on
+    the same starting data always produce the same rows (timestamps are relative to
+    midnight UTC of the day it runs). Every synthetic user shares one precomputed
+    hash of SYNTHETIC_PASSWORD.
+    """
+    rng = random.Random(seed)
+
+    existing = db.session.scalar(
+        db.select(db.func.count()).select_from(User).where(User.username.like("synthetic%"))
+    )
+    if users > existing:
+        pw_hash = _bcrypt.hashpw(SYNTHETIC_PASSWORD.encode("utf-8"), _bcrypt.gensalt(log_rounds())).decode("utf-8")
+        rows = (
+            {
+                "username": synthetic_username(i),
+                "email": f"{synthetic_username(i)}@example.com",
+                "password_hashed": pw_hash,
+                "first_name": "Synthetic",
+                "last_name": "Patient",
+                "has_medical_history": False,
+                "is_admin": False,
+            }
+            for i in range(existing, users)
+        )
+        for n, batch in enumerate(_batches(rows, batch_size), 1):
+            _bulk_insert(User, batch)
+            db.session.commit()
+            echo(f"users: {min(existing + n * batch_size, users)}/{users}")
+
+    if not consultations:
+        return
+
+    user_ids = db.session.scalars(
+        db.select(User.id).where(User.username.like("synthetic%")).order_by(User.id)
+    ).all()
+    questions = db.session.execute(
+        db.select(ConsultQuestion.id, ConsultQuestion.form_id).order_by(ConsultQuestion.id)
+    ).all()
+    if not user_ids or not questions:
+        raise click.ClickException("Need synthetic users and a seeded catalog before adding consultations")
+    followups = {}
+    for fq in db.session.execute(
+        db.select(FollowupQuestions.id, FollowupQuestions.parent_question_id).order_by(FollowupQuestions.id)
+    ):
+        followups.setdefault(fq.parent_question_id, []).append(fq.id)
+
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    done = 0
+    while done < consultations:
+        picks = [
+            (rng.choice(user_ids), rng.choice(questions), rng.random() < 0.8)
+            for _ in range(min(batch_size, consultations - done))
+        ]
+        # ids come back in parameter order, so answers can point at their consultation
+        # started over the last SYNTHETIC_DAYS, submitted up to an hour later
+        started = [today - timedelta(seconds=rng.randrange(SYNTHETIC_DAYS * 86400)) for _ in picks]
+        took = [timedelta(seconds=rng.randrange(60, 3600)) for _ in picks]
+        consult_ids = db.session.scalars(
+            db.insert(Consultation).returning(Consultation.id, sort_by_parameter_order=True),
+            [
+                {"user_id": uid, "form_id": q.form_id, "primary_question_id": q.id,
+                 "status": "submitted" if submitted else "draft",
+                 "created_at": start, "submitted_at": start + delay if submitted else None}
+                for (uid, q, submitted), start, delay in zip(picks, started, took)
+            ],
+        ).all()
+        _bulk_insert(ConsultAnswer, [
+            {"consultation_id": cid, "user_id": uid, "question_id": q.id, "answer_text": "Selected"}
+            for cid, (uid, q, _) in zip(consult_ids, picks)
+        ])
+        _bulk_insert(FollowupAnswers, [
+            {"consultation_id": cid, "question_id": fid,
+             "text_answer": f"Synthetic answer {rng.randrange(10000)}", "file_path": None}
+            for cid, (_, q, submitted) in zip(consult_ids, picks) if submitted
+            for fid in followups.get(q.id, ())
+        ])
+        refresh_summaries(Consultation.id.between(consult_ids[0], consult_ids[-1]))
+        db.session.commit()
+        done += len(picks)
+        echo(f"consultations: {done}/{consultations}")
+
+
+@click.command("seed")
+@click.option("--users", type=int, default=0, help="Total synthetic users to have.")
+@click.option("--consultations", type=int, default=0, help="Synthetic consultations to add.")
+@click.option("--seed", "rng_seed", type=int, default=0, help="Random seed for the synthetic data.")
+@click.option("--batch-size", type=int, default=SYNTHETIC_BATCH_SIZE, show_default=True)
+@with_appcontext
+def seed_command(users, consultations, rng_seed, batch_size):
+    """Seed the catalog and admin, then optionally bulk-generate synthetic patients."""
+    run_seed(current_app._get_current_object())
+    if users or consultations:
+        seed_synthetic(users, consultations, seed=rng_seed, batch_size=batch_size, echo=click.echo)
+
+
 if __name__ == "__main__":
     run_seed()
\ No newline at end of file
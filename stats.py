@@ -0,0 +1,118 @@
+"""Aggregate consultation statistics for the admin dashboards.
+
+Everything is counted with GROUP BY in the database, so a dashboard gets a few
+hundred bytes instead of the consultation table. Results are cached per worker
+for STATS_CACHE_TTL seconds, keyed by the bucket size and window.
+"""
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import func
+
+from models import db, Consultation, ConsultForm, ConsultQuestion
+
+DEFAULT_STATS_CACHE_TTL = 30  # seconds
+BUCKETS = ("day", "week", "month")
+
+_lock = threading.Lock()
+_cache = {}  # (bucket, days) -> (expires_at, stats dict)
+
+
+def _date_bucket(bucket, column):
+    if db.engine.dialect.name == "postgresql":
+        return func.date(func.date_trunc(bucket, column))
+    if bucket == "week":
+        return func.date(column, "weekday 0", "-6 days")  # Monday of that week
+    if bucket == "month":
+        return func.strftime("%Y-%m-01", column)
+    return func.date(column)
+
+
+def _completion_seconds():
+    if db.engine.dialect.name == "postgresql":
+        return func.extract("epoch", Consultation.submitted_at - Consultation.created_at)
+    return (func.julianday(Consultation.submitted_at) - func.julianday(Consultation.created_at)) * 86400
+
+
+def _median_completion(since):
+    submitted = (Consultation.submitted_at.is_not(None), Consultation.submitted_at >= since)
+    seconds = _completion_seconds()
+    if db.engine.dialect.name == "postgresql":
+        value = db.session.scalar(db.select(func.percentile_cont(0.5).within_group(seconds)).where(*submitted))
+        return float(value) if value is not None else None
+
+    # no percentile aggregate elsewhere: read the middle one or two values in order
+    n = db.session.scalar(db.select(func.count()).select_from(Consultation).where(*submitted))
+    if not n:
+        return None
+    middle = db.session.scalars(
+        db.select(seconds).where(*submitted).order_by(seconds).offset((n - 1) // 2).limit(2 - n % 2)
+    ).all()
+    return float(sum(middle) / len(middle))
+
+
+def _label(value):
+    return value if isinstance(value, str) else value.isoformat()
+
+
+def compute_stats(bucket="day", days=30):
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+
+    by_status = db.session.execute(
+        db.select(Consultation.status, func.count()).group_by(Consultation.status).order_by(Consultation.status)
+    ).all()
+    by_question = db.session.execute(
+        db.select(Consultation.primary_question_id, ConsultQuestion.prompt, func.count())
+        .outerjoin(ConsultQuestion, Consultation.primary_question_id == ConsultQuestion.id)
+        .group_by(Consultation.primary_question_id, ConsultQuestion.prompt)
+        .order_by(Consultation.primary_question_id)
+    ).all()
+    by_form = db.session.execute(
+        db.select(Consultation.form_id, ConsultForm.name, func.count())
+        .outerjoin(ConsultForm, Consultation.form_id == ConsultForm.id)
+        .group_by(Consultation.form_id, ConsultForm.name)
+        .order_by(Consultation.form_id)
+    ).all()
+    day = _date_bucket(bucket, Consultation.submitted_at).label("bucket")
+    by_date = db.session.execute(
+        db.select(day, func.count())
+        .where(Consultation.submitted_at.is_not(None), Consultation.submitted_at >= since)
+        .group_by(day)
+        .order_by(day)
+    ).all()
+
+    return {
+        "total": sum(count for _, count in by_status),
+        "by_status": [{"status": status, "count": count} for status, count in by_status],
+        "by_primary_question": [{"id": qid, "prompt": prompt, "count": count} for qid, prompt, count in by_question],
+        "by_form": [{"id": fid, "name": name, "count": count} for fid, name, count in by_form],
+        "submitted": {
+            "bucket": bucket,
+            "days": days,
+            "counts": [{"date": _label(value), "count": count} for value, count in by_date],
+        },
+        "median_completion_seconds": _median_completion(since),
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def get_stats(bucket="day", days=30):
+    """compute_stats(), cached per worker for STATS_CACHE_TTL seconds."""
+    key = (bucket, days)
+    now = time.monotonic()
+    entry = _cache.get(key)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+
+    stats = compute_stats(bucket, days)
+    ttl = current_app.config.get("STATS_CACHE_TTL", DEFAULT_STATS_CACHE_TTL)
+    with _lock:
+        _cache[key] = (now + ttl, stats)
+    return stats
+
+
+def clear_stats_cache():
+    with _lock:
+        _cache.clear()
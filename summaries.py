@@ -0,0 +1,90 @@
+"""Denormalized admin list rows (consultation_summaries).
+
+The admin list reads one consultation_summaries row per consultation instead of
+joining users and questions and counting answers on every request. Each write
+that changes what the list shows calls refresh_summaries() with a predicate
+on Consultation before its commit. The matching rows are rebuilt with one
+DELETE and one INSERT ... SELECT, so they commit or roll back with the write.
+Each rebuild stamps the rows with a new version (time.time_ns()), which the
+detail endpoint uses in its ETag.
+
+The primary question's prompt is not copied into the rows; summary_item() takes
+it from the cached catalog, so renaming a question rewrites no summaries.
+"""
+import time
+
+from sqlalchemy import BigInteger, case, func, literal, select
+
+from models import db, ConsultAnswer, Consultation, ConsultationSummary, FollowupAnswers, User
+
+SUMMARY_COLUMNS = (
+    "consultation_id", "user_id", "form_id", "primary_question_id", "status", "first_name", "last_name",
+    "answer_count", "followup_answer_count", "photo_count", "version", "updated_at",
+)
+
+
+def _count(model, *where, column=None):
+    return (
+        select(func.count() if column is None else func.count(column.distinct()))
+        .select_from(model)
+        .where(model.consultation_id == Consultation.id, *where)
+        .scalar_subquery()
+    )
+
+
+def summary_select(where, version):
+    """SELECT producing summary rows for the consultations matching where."""
+    return (
+        select(
+            Consultation.id,
+            Consultation.user_id,
+            Consultation.form_id,
+            Consultation.primary_question_id,
+            Consultation.status,
+            User.first_name,
+            User.last_name,
+            _count(ConsultAnswer),
+            _count(FollowupAnswers),
+            case((Consultation.photo_sha256.is_not(None), 1), else_=0)
+            + _count(FollowupAnswers, column=FollowupAnswers.file_path),
+            literal(version, BigInteger),
+            func.now(),
+        )
+        .outerjoin(User, Consultation.user_id == User.id)
+        .where(where)
+    )
+
+
+def refresh_summaries(where):
+    """Rebuild the summary rows of every consultation matching where.
+
+    where is a clause on Consultation, e.g. Consultation.id == 5 or
+    Consultation.primary_question_id == 2.
+    """
+    # plain DELETE + INSERT ... SELECT stay in SQLAlchemy's compiled cache; the
+    # dialect upserts (ON CONFLICT) are recompiled on every call
+    ids = select(Consultation.id).where(where).scalar_subquery()
+    db.session.execute(
+        db.delete(ConsultationSummary).where(ConsultationSummary.consultation_id.in_(ids)),
+        execution_options={"synchronize_session": False},
+    )
+    db.session.execute(
+        db.insert(ConsultationSummary).from_select(SUMMARY_COLUMNS, summary_select(where, time.time_ns()))
+    )
+
+
+def summary_item(row, questions):
+    """Admin list item for a summary row (a ConsultationSummary or a row with its columns).
+
+    questions is get_catalog()["questions"].
+    """
+    question = questions.get(row.primary_question_id)
+    return {
+        "id": row.consultation_id,
+        "status": row.status,
+        "user": f"{row.first_name}{row.last_name}" if row.user_id is not None else None,
+        "primary_question": question["prompt"] if question is not None else None,
+        "answer_count": row.answer_count,
+        "followup_answer_count": row.followup_answer_count,
+        "photo_count": row.photo_count,
+    }
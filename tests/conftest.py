@@ -1,35 +1,150 @@
 import sys, os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+os.environ.setdefault("APP_CONFIG", "testing")
+
+from contextlib import contextmanager
+
 import pytest
-from app import app, db
-from models import User, ConsultForm, ConsultQuestion, FollowupQuestions
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
 
-@pytest.fixture
-def client():
-    app.config["SQLALCHEMY_DATABASE_URI"] = "postgresql:///dermhub_test"
-    app.config["TESTING"] = True
-    app.config["WTF_CSRF_ENABLED"] = False
+from app import app, db
+from models import User, ConsultForm, ConsultQuestion, FollowupQuestions, Consultation, ConsultAnswer, FollowupAnswers
+from summaries import refresh_summaries
+from catalog import clear_catalog_cache
+from current_user import clear_user_cache
+from metrics import reset_metrics
+from stats import clear_stats_cache
+from passwords import clear_login_throttle
 
+@pytest.fixture(scope="session")
+def schema():
+    """Create the tables once per test process."""
     with app.app_context():
         db.drop_all()
         db.create_all()
+    yield
+    with app.app_context():
+        db.drop_all()
+
+
+@pytest.fixture
+def client(schema):
+    """Every session opened during the test joins one outer transaction, which
+    is rolled back afterwards; commits inside the app only release SAVEPOINTs."""
+    with app.app_context():
+        connection = db.engine.connect()
+    outer = connection.begin()
+    if connection.dialect.name == "postgresql":
+        # sequences don't roll back; restart them so ids start at 1 like on SQLite
+        tables = ", ".join(t.name for t in db.metadata.sorted_tables)
+        connection.exec_driver_sql(f"TRUNCATE {tables} RESTART IDENTITY CASCADE")
+    db.session.session_factory.configure(bind=connection, join_transaction_mode="create_savepoint")
+
+    try:
+        with app.app_context():
+            clear_catalog_cache()
+            clear_user_cache()
+            clear_login_throttle()
+            reset_metrics()
+            clear_stats_cache()
+
+            # Create a consult form (name is REQUIRED)
+            form = ConsultForm(name="Test Dermatology Form")
+            db.session.add(form)
+            db.session.flush()
+
+            # Primary question
+            q1 = ConsultQuestion(prompt="Acne", form_id=form.id)
+            db.session.add(q1)
+            db.session.flush()
+
+            # Follow-up question linked to primary question
+            f1 = FollowupQuestions(prompt="How long has this been a concern?", parent_question_id=q1.id)
+            db.session.add(f1)
+
+            db.session.commit()
 
-        # Create a consult form (name is REQUIRED)
-        form = ConsultForm(name="Test Dermatology Form")
-        db.session.add(form)
-        db.session.flush()
+        with app.test_client() as client:
+            yield client
+    finally:
+        db.session.session_factory.configure(bind=None)
+        outer.rollback()
+        connection.close()
 
-        # Primary question
-        q1 = ConsultQuestion(prompt="Acne", form_id=form.id)
-        db.session.add(q1)
-        db.session.flush()
 
-        # Follow-up question linked to primary question
-        f1 = FollowupQuestions(prompt="How long has this been a concern?", parent_question_id=q1.id)
-        db.session.add(f1)
+@pytest.fixture
+def admin_headers(client):
+    """Authorization headers of a new admin (admin1)."""
+    with app.app_context():
+        admin = User.signup("admin1", "admin1@test.com", "Password1!", "Ad", "Min")
+        admin.is_admin = True
+        db.session.commit()
+        token = create_access_token(identity=str(admin.id), additional_claims={"is_admin": True})
+    return {"Authorization": f"Bearer {token}"}
+
 
+@pytest.fixture
+def patient(client):
+    """Log the test client in as a new patient (u1, "A B")."""
+    with app.app_context():
+        u = User.signup("u1", "u1@test.com", "password", "A", "B")
         db.session.commit()
+    client.post("/login", data={"username": "u1", "password": "password"})
+    return u
+
+
+@pytest.fixture
+def add_consultations(client):
+    """add_consultations(n): n draft consultations on question 1, each by a new patient."""
+    def add(n):
+        with app.app_context():
+            start = User.query.count()
+            for i in range(start, start + n):
+                # skip bcrypt here, these users never log in
+                u = User(username=f"patient{i}", email=f"patient{i}@test.com",
+                         password_hashed="x", first_name="Pat", last_name=str(i))
+                db.session.add(u)
+                db.session.flush()
+                db.session.add(Consultation(user_id=u.id, form_id=1, primary_question_id=1))
+            db.session.flush()
+            refresh_summaries(Consultation.id > 0)
+            db.session.commit()
+    return add
+
+
+@pytest.fixture
+def add_followup_answers(client):
+    """add_followup_answers(consultation_id, n): an initial answer and n follow-up answers."""
+    def add(consultation_id, n):
+        with app.app_context():
+            db.session.add(ConsultAnswer(consultation_id=consultation_id, question_id=1, answer_text="Since May"))
+            for i in range(n):
+                db.session.add(FollowupAnswers(consultation_id=consultation_id, question_id=1,
+                                               text_answer=f"answer {i}"))
+            db.session.flush()
+            refresh_summaries(Consultation.id == consultation_id)
+            db.session.commit()
+    return add
+
+
+@pytest.fixture
+def count_queries(client):
+    """count_queries(): a context manager collecting every SQL statement sent
+    to the engine while its block runs."""
+    @contextmanager
+    def count():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, params, context, executemany):
+            statements.append(statement)
 
-    with app.test_client() as client:
-        yield client
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return count
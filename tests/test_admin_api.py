@@ -0,0 +1,193 @@
+from flask_jwt_extended import create_access_token
+
+from models import Consultation, ConsultAnswer, FollowupAnswers, Upload, User, db
+from app import app
+from summaries import refresh_summaries
+
+
+def test_consultations_list(client, admin_headers, add_consultations):
+    add_consultations(2)
+
+    resp = client.get("/api/consultations", headers=admin_headers)
+
+    assert resp.status_code == 200
+    data = resp.get_json()["items"]
+    assert [c["primary_question"] for c in data] == ["Acne", "Acne"]
+    assert data[0]["user"] == "Pat1"
+    assert data[0]["status"] == "draft"
+
+
+def test_consultations_list_query_count_is_constant(client, admin_headers, add_consultations, count_queries):
+    add_consultations(2)
+    client.get("/api/consultations", headers=admin_headers)  # loads the catalog cache
+    with count_queries() as small:
+        client.get("/api/consultations", headers=admin_headers)
+
+    add_consultations(10)
+    with count_queries() as large:
+        resp = client.get("/api/consultations", headers=admin_headers)
+
+    assert len(resp.get_json()["items"]) == 12
+    assert len(large) == len(small)
+
+
+def test_consultations_keyset_pages(client, admin_headers, add_consultations):
+    add_consultations(5)
+
+    seen = []
+    cursor = ""
+    while cursor is not None:
+        resp = client.get(f"/api/consultations?limit=2&cursor={cursor}", headers=admin_headers)
+        body = resp.get_json()
+        assert len(body["items"]) <= 2
+        seen += [c["id"] for c in body["items"]]
+        cursor = body["next_cursor"]
+
+    assert seen == [1, 2, 3, 4, 5]
+
+    resp = client.get("/api/consultations?limit=2&sort=-id&cursor=4", headers=admin_headers)
+    assert [c["id"] for c in resp.get_json()["items"]] == [3, 2]
+
+
+def test_consultations_filters(client, admin_headers, add_consultations):
+    add_consultations(3)
+    with app.app_context():
+        Consultation.query.filter_by(id=2).update({"status": "submitted"})
+        refresh_summaries(Consultation.id == 2)
+        db.session.commit()
+
+    resp = client.get("/api/consultations?status=submitted", headers=admin_headers)
+    assert [c["id"] for c in resp.get_json()["items"]] == [2]
+
+    resp = client.get("/api/consultations?user_id=3", headers=admin_headers)
+    assert [c["id"] for c in resp.get_json()["items"]] == [2]
+
+    resp = client.get("/api/consultations?primary_question_id=99", headers=admin_headers)
+    assert resp.get_json()["items"] == []
+
+    resp = client.get("/api/consultations?limit=abc", headers=admin_headers)
+    assert resp.status_code == 400
+
+
+def test_consultation_detail(client, admin_headers, add_consultations, add_followup_answers):
+    add_consultations(1)
+    add_followup_answers(1, 2)
+
+    resp = client.get("/api/consultations/1", headers=admin_headers)
+
+    data = resp.get_json()
+    assert data["user"]["first_name"] == "Pat"
+    assert data["primary_concern"] == "Acne"
+    assert data["initial_answer"] == "Since May"
+    assert data["followup_answers"][0]["prompt"] == "How long has this been a concern?"
+    assert data["followup_answers"][0]["photo"] == {}
+    assert client.get("/api/consultations/99", headers=admin_headers).status_code == 404
+
+
+def test_consultation_detail_photo_without_followups(client, admin_headers, add_consultations):
+    add_consultations(1)
+    with app.app_context():
+        db.session.add(Upload(sha256="ab" * 32, extension=".jpg", size_bytes=3))
+        Consultation.query.filter_by(id=1).update({"photo_sha256": "ab" * 32})
+        db.session.commit()
+
+    data = client.get("/api/consultations/1", headers=admin_headers).get_json()
+
+    assert data["followup_answers"] == []
+    assert data["file_path"].endswith("ab" * 32 + ".jpg")
+    assert data["photo"] == {}
+
+
+def test_consultation_detail_query_count_is_constant(client, admin_headers, add_consultations, add_followup_answers,
+                                                     count_queries):
+    add_consultations(2)
+    add_followup_answers(1, 1)
+    add_followup_answers(2, 8)
+    client.get("/api/questions", headers=admin_headers)  # the ETag reads the catalog version; load it first
+
+    with count_queries() as small:
+        client.get("/api/consultations/1", headers=admin_headers)
+    with count_queries() as large:
+        resp = client.get("/api/consultations/2", headers=admin_headers)
+
+    assert len(resp.get_json()["followup_answers"]) == 8
+    assert len(large) == len(small)
+
+
+def test_consultation_detail_batch(client, admin_headers, add_consultations, add_followup_answers, count_queries):
+    add_consultations(3)
+    add_followup_answers(1, 2)
+    add_followup_answers(3, 1)
+
+    with count_queries() as two:
+        client.get("/api/consultations?ids=1,3&expand=detail", headers=admin_headers)
+    with count_queries() as three:
+        resp = client.get("/api/consultations?ids=1,2,3&expand=detail", headers=admin_headers)
+
+    items = resp.get_json()["items"]
+    assert [c["id"] for c in items] == [1, 2, 3]
+    assert [len(c["followup_answers"]) for c in items] == [2, 0, 1]
+    assert len(three) == len(two)
+
+
+def test_questions_served_from_catalog_cache(client, admin_headers, count_queries):
+    client.get("/api/questions", headers=admin_headers)
+
+    with count_queries() as statements:
+        resp = client.get("/api/questions", headers=admin_headers)
+
+    assert resp.get_json()[0]["followups"][0]["prompt"] == "How long has this been a concern?"
+    assert not any("consult_questions" in s or "followup_questions" in s for s in statements)
+
+
+def test_catalog_edits_invalidate_cache(client, admin_headers):
+    client.get("/api/questions", headers=admin_headers)
+
+    client.patch("/api/questions/1", json={"prompt": "Acne/Rosacea"}, headers=admin_headers)
+    client.post("/api/questions/1/followups", json={"prompt": "Any scarring?"}, headers=admin_headers)
+    client.delete("/api/followups/1", headers=admin_headers)
+
+    resp = client.get("/api/questions/1", headers=admin_headers)
+    data = resp.get_json()
+    assert data["prompt"] == "Acne/Rosacea"
+    assert [f["prompt"] for f in data["followups"]] == ["Any scarring?"]
+
+
+def test_delete_question_is_set_based(client, admin_headers, add_consultations, add_followup_answers, count_queries):
+    add_consultations(10)
+    for consultation_id in range(1, 11):
+        add_followup_answers(consultation_id, 3)
+
+    with count_queries() as statements:
+        resp = client.delete("/api/questions/1", headers=admin_headers)
+
+    assert resp.get_json() == {"deleted": 1}
+    assert len([s for s in statements if s.startswith("DELETE")]) == 6
+    with app.app_context():
+        assert Consultation.query.count() == 0
+        assert ConsultAnswer.query.count() == 0
+        assert FollowupAnswers.query.count() == 0
+    assert client.delete("/api/questions/1", headers=admin_headers).status_code == 404
+
+
+def test_admin_claim_skips_user_lookup(client, admin_headers, count_queries):
+    with count_queries() as statements:
+        client.get("/api/consultations", headers=admin_headers)
+
+    assert not any("FROM users \nWHERE" in s for s in statements)
+
+
+def test_token_without_admin_claim_is_checked(client):
+    with app.app_context():
+        u = User(username="patient", email="p@test.com", password_hashed="x")
+        db.session.add(u)
+        db.session.commit()
+        token = create_access_token(identity=str(u.id))
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert client.get("/api/consultations", headers=headers).status_code == 403
+
+    with app.app_context():
+        User.query.get(u.id).is_admin = True
+        db.session.commit()
+    assert client.get("/api/consultations", headers=headers).status_code == 200
@@ -1,3 +1,11 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import current_user
+import passwords
+from current_user import get_cached_user
 from models import User, db
 from app import app
 
@@ -67,3 +75,115 @@ def test_signup_password_missing_symbol(client):
     with app.app_context():
         assert User.query.filter_by(username="testsym3").first() is None
 
+
+
+
+def test_current_user_loaded_lazily_and_cached(client, count_queries):
+    with app.app_context():
+        u = User(username="lazyuser", email="lazy@test.com", password_hashed="x", first_name="Lazy")
+        db.session.add(u)
+        db.session.commit()
+        user_id = u.id
+    with client.session_transaction() as sess:
+        sess["curr_user_id"] = user_id
+
+    with count_queries() as statements:
+        client.get("/static/style.css")
+    assert statements == []
+
+    assert b"Welcome Lazy!" in client.get("/feedback").data
+    with count_queries() as statements:
+        client.get("/feedback")
+    assert not any("FROM users" in s for s in statements)
+
+    with app.app_context():
+        User.query.get(user_id).first_name = "Renamed"
+        db.session.commit()
+    assert b"Welcome Renamed!" in client.get("/feedback").data
+
+
+
+def make_user(username, password="Password1!"):
+    with app.app_context():
+        u = User.signup(username, f"{username}@test.com", password, "T", "User")
+        u.is_admin = True
+        db.session.commit()
+        return u.id
+
+
+def test_login_throttled_per_username(client, monkeypatch):
+    monkeypatch.setitem(app.config, "LOGIN_FAILURES_PER_USERNAME", 3)
+    make_user("victim")
+
+    for _ in range(3):
+        resp = client.post("/api/admin/login", json={"username": "victim", "password": "wrong"})
+        assert resp.status_code == 401
+
+    resp = client.post("/api/admin/login", json={"username": "victim", "password": "Password1!"})
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) > 0
+
+
+def test_login_throttled_per_forwarded_client(client, monkeypatch):
+    monkeypatch.setitem(app.config, "LOGIN_ATTEMPTS_PER_IP", 2)
+    make_user("shared")
+
+    def login_from(addr):
+        return client.post("/api/admin/login", json={"username": "shared", "password": "Password1!"},
+                           headers={"X-Forwarded-For": addr})
+
+    assert login_from("203.0.113.1").status_code == 200
+    assert login_from("203.0.113.1").status_code == 200
+    assert login_from("203.0.113.1").status_code == 429
+    # everyone arrives through the same proxy, but budgets are per client
+    assert login_from("203.0.113.2").status_code == 200
+
+
+def test_password_pool_overload_is_rejected(client, monkeypatch):
+    make_user("busyuser")
+    passwords.shutdown_pool()
+    monkeypatch.setitem(app.config, "PASSWORD_MAX_PENDING", 0)
+    try:
+        resp = client.post("/api/admin/login", json={"username": "busyuser", "password": "Password1!"})
+        assert resp.status_code == 503
+    finally:
+        passwords.shutdown_pool()
+
+
+def test_user_cache_keeps_the_most_recently_used(client, monkeypatch):
+    monkeypatch.setitem(app.config, "USER_CACHE_SIZE", 2)
+    with app.app_context():
+        ids = [make_user(f"cached{i}") for i in range(3)]
+        get_cached_user(ids[0])
+        get_cached_user(ids[1])
+        get_cached_user(ids[0])  # now the most recent
+        get_cached_user(ids[2])
+        assert list(current_user._cache) == [ids[0], ids[2]]
+
+
+def test_password_pool_recovers_after_a_worker_dies(client):
+    make_user("crashuser")
+    passwords.shutdown_pool()
+    broken = ProcessPoolExecutor(max_workers=1)
+    assert isinstance(broken.submit(os._exit, 1).exception(), BrokenProcessPool)
+    slots = threading.BoundedSemaphore(1)
+    passwords._pool, passwords._slots = broken, slots
+    try:
+        login = {"username": "crashuser", "password": "Password1!"}
+        assert client.post("/api/admin/login", json=login).status_code == 503
+        assert slots.acquire(blocking=False)  # the slot was given back
+        assert client.post("/api/admin/login", json=login).status_code == 200
+    finally:
+        passwords.shutdown_pool()
+
+
+def test_login_rehashes_on_cost_change(client, monkeypatch):
+    monkeypatch.setitem(app.config, "BCRYPT_LOG_ROUNDS", 4)
+    user_id = make_user("oldhash")
+    monkeypatch.setitem(app.config, "BCRYPT_LOG_ROUNDS", 5)
+
+    resp = client.post("/api/admin/login", json={"username": "oldhash", "password": "Password1!"})
+
+    assert resp.status_code == 200
+    with app.app_context():
+        assert User.query.get(user_id).password_hashed.startswith("$2b$05$")
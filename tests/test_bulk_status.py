@@ -0,0 +1,109 @@
+from app import app
+from models import Consultation, ConsultationEvent, ConsultationSummary, EmailOutbox, FollowupAnswers, db
+from summaries import refresh_summaries
+
+
+def set_status(ids, status):
+    with app.app_context():
+        db.session.execute(db.update(Consultation).where(Consultation.id.in_(ids)).values(status=status))
+        refresh_summaries(Consultation.id.in_(ids))
+        db.session.commit()
+
+
+def statuses():
+    with app.app_context():
+        return dict(db.session.execute(
+            db.select(ConsultationSummary.consultation_id, ConsultationSummary.status)
+        ).all())
+
+
+def test_bulk_update_by_ids(client, admin_headers, add_consultations):
+    add_consultations(4)
+    set_status([1, 2, 3], "submitted")
+
+    resp = client.patch("/api/consultations/bulk", json={"status": "reviewed", "ids": [1, 2, 4, 99]},
+                        headers=admin_headers)
+
+    assert resp.status_code == 200
+    assert resp.get_json() == {"status": "reviewed", "updated": [1, 2], "skipped": [4, 99]}
+    assert statuses() == {1: "reviewed", 2: "reviewed", 3: "submitted", 4: "draft"}
+    with app.app_context():
+        emails = db.session.execute(db.select(EmailOutbox.to_email, EmailOutbox.subject)).all()
+        kinds = db.session.execute(db.select(ConsultationEvent.consultation_id, ConsultationEvent.kind)).all()
+    assert sorted(to for to, _ in emails) == ["patient1@test.com", "patient2@test.com"]
+    assert sorted(kinds) == [(1, "status"), (2, "status")]
+
+    # a retried request finds nothing left to move
+    resp = client.patch("/api/consultations/bulk", json={"status": "reviewed", "ids": [1, 2]}, headers=admin_headers)
+    assert resp.get_json()["updated"] == []
+
+
+def test_bulk_update_by_filter_is_set_based(client, admin_headers, add_consultations, count_queries):
+    add_consultations(3)
+    set_status([1, 2, 3], "submitted")
+    add_consultations(20)
+    set_status(list(range(4, 24)), "submitted")
+
+    with count_queries() as statements:
+        resp = client.patch("/api/consultations/bulk",
+                            json={"status": "in_review", "filter": {"status": "submitted", "form_id": 1}},
+                            headers=admin_headers)
+
+    assert len(resp.get_json()["updated"]) == 23
+    assert set(statuses().values()) == {"in_review"}
+    assert sum(s.startswith("UPDATE consultations") for s in statements) == 1
+    assert len(statements) < 20
+
+
+def test_bulk_update_validates(client, admin_headers, add_consultations):
+    add_consultations(1)
+
+    def patch(body):
+        return client.patch("/api/consultations/bulk", json=body, headers=admin_headers)
+
+    assert patch({"status": "archived", "ids": [1]}).status_code == 400
+    assert patch({"status": "draft", "ids": [1]}).status_code == 400  # nothing moves back to draft
+    assert patch({"status": "reviewed", "filter": {"status": "draft"}}).status_code == 400
+    assert patch({"status": "reviewed", "filter": {"color": "red"}}).status_code == 400
+    assert patch({"status": "reviewed"}).status_code == 400
+    assert patch({"status": "reviewed", "ids": ["1"]}).status_code == 400
+    assert patch({"status": "reviewed", "filter": {"status": []}}).status_code == 400
+    assert patch({"status": ["reviewed"], "ids": [1]}).status_code == 400
+    assert statuses() == {1: "draft"}
+    assert client.patch("/api/consultations/bulk", json={"status": "closed", "ids": [1]}).status_code == 401
+
+
+def test_patients_cannot_resubmit_a_reviewed_consultation(client, admin_headers, patient):
+    client.post("/consult/1", data={"concern": "1"})
+    client.post("/consult/1/followup", data={"f_answer_1": "A week"})
+    client.patch("/api/consultations/bulk", json={"status": "reviewed", "ids": [1]}, headers=admin_headers)
+    with app.app_context():
+        submitted_at = db.session.get(Consultation, 1).submitted_at
+
+    resp = client.post("/consult/1/followup", data={"f_answer_1": "Again"})
+
+    assert resp.status_code == 302
+    assert statuses() == {1: "reviewed"}
+    with app.app_context():
+        assert db.session.get(Consultation, 1).submitted_at == submitted_at
+        assert db.session.scalar(db.select(db.func.count()).select_from(FollowupAnswers)) == 1
+
+
+def test_patients_answer_a_needs_info_request(client, admin_headers, patient):
+    client.post("/consult/1", data={"concern": "1"})
+    client.post("/consult/1/followup", data={"f_answer_1": "A week"})
+    for status in ("in_review", "needs_info"):
+        client.patch("/api/consultations/bulk", json={"status": status, "ids": [1]}, headers=admin_headers)
+    with app.app_context():
+        submitted_at = db.session.get(Consultation, 1).submitted_at
+    assert b"Add information" in client.get("/dashboard").data
+
+    resp = client.post("/consult/1/followup", data={"f_answer_1": "Two weeks, and spreading"})
+
+    assert resp.status_code == 302
+    assert statuses() == {1: "in_review"}
+    with app.app_context():
+        assert db.session.get(Consultation, 1).submitted_at == submitted_at
+        answers = db.session.scalars(db.select(FollowupAnswers.text_answer).order_by(FollowupAnswers.id)).all()
+        assert answers == ["A week", "Two weeks, and spreading"]
+        assert db.session.scalar(db.select(ConsultationEvent.kind).order_by(ConsultationEvent.id.desc())) == "status"
@@ -0,0 +1,50 @@
+from app import app
+from models import Consultation, db
+from summaries import refresh_summaries
+
+
+def revalidate(client, path, headers):
+    first = client.get(path, headers=headers)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    again = client.get(path, headers={**headers, "If-None-Match": etag})
+    return first, again
+
+
+def test_catalog_etags(client, admin_headers):
+    for path in ("/api/questions", "/api/questions/1", "/api/followups/1"):
+        first, again = revalidate(client, path, admin_headers)
+        assert first.headers["Cache-Control"] == "private, no-cache"
+        assert again.status_code == 304
+        assert again.data == b""
+        assert again.headers["ETag"] == first.headers["ETag"]
+
+    etag = client.get("/api/questions", headers=admin_headers).headers["ETag"]
+    client.patch("/api/questions/1", json={"prompt": "Acne/Rosacea"}, headers=admin_headers)
+    resp = client.get("/api/questions", headers={**admin_headers, "If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.get_json()[0]["prompt"] == "Acne/Rosacea"
+
+
+def test_consultation_detail_etag(client, admin_headers, add_consultations, add_followup_answers, count_queries):
+    add_consultations(1)
+    add_followup_answers(1, 3)
+
+    first, again = revalidate(client, "/api/consultations/1", admin_headers)
+    assert again.status_code == 304
+
+    # a 304 skips the detail queries entirely
+    with count_queries() as statements:
+        client.get("/api/consultations/1", headers={**admin_headers, "If-None-Match": first.headers["ETag"]})
+    assert not any("followup_answers" in s for s in statements if s.startswith("SELECT"))
+
+    with app.app_context():
+        db.session.execute(db.update(Consultation).where(Consultation.id == 1).values(status="reviewed"))
+        refresh_summaries(Consultation.id == 1)
+        db.session.commit()
+    resp = client.get("/api/consultations/1", headers={**admin_headers, "If-None-Match": first.headers["ETag"]})
+    assert resp.status_code == 200
+    assert resp.get_json()["status"] == "reviewed"
+    assert resp.headers["ETag"] != first.headers["ETag"]
+
+    assert client.get("/api/consultations/99", headers=admin_headers).status_code == 404
@@ -1,16 +1,15 @@
-from models import Consultation, FollowupAnswers, User, db
-from app import app
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
 
-def login(client):
-    with app.app_context():   # ✅ create user inside context
-        u = User.signup("u1", "u1@test.com", "password", "A", "B")
-        db.session.commit()
-    client.post("/login", data={"username": "u1", "password": "password"})
-    return u
+from PIL import Image
 
-def test_select_primary_question(client):
-    login(client)
+import images
+from images import shutdown_pool
+from models import Consultation, FollowupAnswers, Upload
+from app import app
 
+def test_select_primary_question(client, patient):
     client.post("/consult/1", data={"concern": "1"})
 
     with app.app_context():   # ✅ query inside context
@@ -18,8 +17,7 @@ def test_select_primary_question(client):
         assert consult is not None
         assert consult.primary_question_id == 1
 
-def test_followup_answers(client):
-    login(client)
+def test_followup_answers(client, patient):
     client.post("/consult/1", data={"concern": "1"})
 
     with app.app_context():
@@ -33,3 +31,114 @@ def test_followup_answers(client):
         answers = FollowupAnswers.query.all()
         assert len(answers) == 1
         assert answers[0].text_answer == "More than 6 months"
+        assert Consultation.query.get(consult.id).status == "submitted"
+
+
+
+def submit_photo(client, data, filename="IMG_0001.jpg"):
+    client.post("/consult/1", data={"concern": "1"})
+    with app.app_context():
+        consult_id = Consultation.query.order_by(Consultation.id.desc()).first().id
+    return client.post(f"/consult/{consult_id}/followup", data={
+        "f_answer_1": "A week",
+        "followup-image": (io.BytesIO(data), filename),
+    }, content_type="multipart/form-data")
+
+
+def test_photo_upload_is_content_addressed(client, patient, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, "UPLOAD_FOLDER", str(tmp_path))
+
+    submit_photo(client, b"same photo bytes")
+    submit_photo(client, b"same photo bytes")
+
+    with app.app_context():
+        upload = Upload.query.one()
+        assert [c.photo_sha256 for c in Consultation.query.all()] == [upload.sha256] * 2
+        assert [a.file_path for a in FollowupAnswers.query.all()] == [None] * 2
+        stored = tmp_path / upload.storage_key
+        assert stored.read_bytes() == b"same photo bytes"
+        assert stored.parent.parent.name == upload.sha256[:2]
+    assert os.listdir(tmp_path / "tmp") == []
+
+
+def test_photo_upload_size_limit(client, patient, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, "UPLOAD_FOLDER", str(tmp_path))
+    monkeypatch.setitem(app.config, "MAX_UPLOAD_BYTES", 10)
+
+    resp = submit_photo(client, b"x" * 11)
+
+    assert resp.status_code == 200
+    with app.app_context():
+        assert FollowupAnswers.query.count() == 0
+        assert Upload.query.count() == 0
+    assert os.listdir(tmp_path / "tmp") == []
+
+
+
+def phone_photo():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # orientation: rotate 90 degrees on display
+    exif[0x010F] = "PhoneMaker"
+    buf = io.BytesIO()
+    Image.new("RGB", (4000, 3000), "tan").save(buf, "JPEG", exif=exif)
+    return buf.getvalue()
+
+
+def test_photo_derivatives(client, patient, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, "UPLOAD_FOLDER", str(tmp_path))
+
+    submit_photo(client, phone_photo())
+    shutdown_pool()  # wait for the pool to finish
+
+    with app.app_context():
+        base = os.path.splitext(tmp_path / Upload.query.one().storage_key)[0]
+    for size, bound in (("thumbnail", 320), ("review", 1600)):
+        for ext in ("jpg", "webp"):
+            with Image.open(f"{base}_{size}.{ext}") as im:
+                assert max(im.size) == bound
+                assert im.height > im.width  # exif rotation applied
+                assert not im.getexif()
+
+
+def test_photo_derivatives_survive_a_dead_pool_process(client, patient, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, "UPLOAD_FOLDER", str(tmp_path))
+    shutdown_pool()
+    broken = ProcessPoolExecutor(max_workers=1)
+    broken.submit(os._exit, 1).exception()  # the worker process dies
+    images._pool = broken
+
+    resp = submit_photo(client, phone_photo())
+    assert resp.status_code == 302
+
+    assert images._pool is not broken
+    shutdown_pool()  # wait for the fresh pool
+    with app.app_context():
+        assert os.path.exists(images.derivative_path(Upload.query.one(), "review", "webp"))
+
+
+def test_resubmitting_without_a_file_keeps_the_photo(client, patient, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, "UPLOAD_FOLDER", str(tmp_path))
+    submit_photo(client, b"photo bytes")
+
+    with app.app_context():
+        consult = Consultation.query.one()
+    client.post(f"/consult/{consult.id}/followup", data={"f_answer_1": "A week"})
+
+    with app.app_context():
+        assert consult.photo_sha256 is not None
+        assert Consultation.query.one().photo_sha256 == consult.photo_sha256
+
+
+def test_dashboard_query_count_is_constant(client, patient, count_queries):
+    client.post("/consult/1", data={"concern": "1"})
+    client.get("/dashboard")  # loads the catalog and user caches
+    with count_queries() as one:
+        client.get("/dashboard")
+
+    client.post("/consult/1", data={"concern": "1"})
+    with count_queries() as two:
+        resp = client.get("/dashboard")
+
+    assert resp.data.count(b"<td>Acne</td>") == 2
+    assert len(two) == len(one)
+    assert not any("consult_questions" in s for s in two)
@@ -0,0 +1,108 @@
+import json
+import time
+
+import events
+from app import app
+from events import EventHub, record_event
+from models import db
+
+
+def parse(body):
+    """SSE body -> list of (id, event, data) for every message with data."""
+    messages = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if "data" in fields:
+            messages.append((int(fields["id"]), fields["event"], json.loads(fields["data"])))
+    return messages
+
+
+def test_stream_replays_after_last_event_id(client, admin_headers, patient, monkeypatch):
+    monkeypatch.setitem(app.config, "STREAM_MAX_SECONDS", 0)
+    client.post("/consult/1", data={"concern": "1"})
+    client.post("/consult/1/followup", data={"f_answer_1": "A week"})
+
+    resp = client.get("/api/consultations/stream", headers={**admin_headers, "Last-Event-ID": "0"})
+
+    assert resp.mimetype == "text/event-stream"
+    messages = parse(resp.get_data(as_text=True))
+    assert [(kind, data["consultation_id"]) for _, kind, data in messages] == [("created", 1), ("submitted", 1)]
+    assert messages[-1][2]["consultation"]["status"] == "submitted"
+
+    first_id = messages[0][0]
+    resp = client.get("/api/consultations/stream", headers={**admin_headers, "Last-Event-ID": str(first_id)})
+    assert [kind for _, kind, _ in parse(resp.get_data(as_text=True))] == ["submitted"]
+
+    # a fresh connection starts from now
+    resp = client.get("/api/consultations/stream", headers=admin_headers)
+    assert parse(resp.get_data(as_text=True)) == []
+
+
+def test_stream_requires_admin(client):
+    assert client.get("/api/consultations/stream").status_code == 401
+
+
+def test_stream_accepts_a_token_in_the_query_string(client, admin_headers, add_consultations, monkeypatch):
+    # what the browser's EventSource sends, as it cannot set headers
+    monkeypatch.setitem(app.config, "STREAM_MAX_SECONDS", 0)
+    token = admin_headers["Authorization"].removeprefix("Bearer ")
+    add_consultations(1)
+    with app.app_context():
+        record_event(1, "created")
+        db.session.commit()
+
+    resp = client.get(f"/api/consultations/stream?jwt={token}&last_event_id=0")
+    assert resp.status_code == 200
+    assert [kind for _, kind, _ in parse(resp.get_data(as_text=True))] == ["created"]
+
+    # only the stream takes it from the URL
+    assert client.get(f"/api/consultations?jwt={token}").status_code == 401
+
+
+def test_hub_fans_out_and_detects_gaps(client, add_consultations, monkeypatch):
+    monkeypatch.setattr(events, "EVENT_BUFFER_SIZE", 2)
+    add_consultations(3)
+    hub = EventHub(app)
+    start = hub.high_water
+
+    with app.app_context():
+        for consultation_id in (1, 2, 3):
+            record_event(consultation_id, "created")
+        db.session.commit()
+    hub.poll()
+
+    assert hub.wait(start, timeout=0) is None  # the first event fell out of the buffer
+    assert [e["consultation_id"] for e in hub.wait(hub.floor, timeout=0)] == [2, 3]
+    assert hub.wait(hub.high_water, timeout=0) == []
+
+
+def test_stream_without_events_still_sets_last_event_id(client, admin_headers, add_consultations, monkeypatch):
+    monkeypatch.setitem(app.config, "STREAM_MAX_SECONDS", 0)
+
+    # a fresh stream that sees no events before it ends
+    body = client.get("/api/consultations/stream", headers=admin_headers).get_data(as_text=True)
+    ids = [line.split(": ", 1)[1] for line in body.splitlines() if line.startswith("id: ")]
+    assert len(ids) == 1
+
+    # committed while the client waits to reconnect; it must not be lost
+    add_consultations(1)
+    with app.app_context():
+        record_event(1, "created")
+        db.session.commit()
+
+    resp = client.get("/api/consultations/stream", headers={**admin_headers, "Last-Event-ID": ids[-1]})
+    assert [(kind, data["consultation_id"]) for _, kind, data in parse(resp.get_data(as_text=True))] == [("created", 1)]
+
+
+def test_streams_over_the_limit_only_get_the_backlog(client, admin_headers, add_consultations, monkeypatch):
+    monkeypatch.setitem(app.config, "STREAM_MAX_SECONDS", 30)
+    monkeypatch.setitem(app.config, "STREAM_MAX_CONNECTIONS", 0)
+    add_consultations(1)
+    with app.app_context():
+        record_event(1, "created")
+        db.session.commit()
+
+    started = time.monotonic()
+    resp = client.get("/api/consultations/stream", headers={**admin_headers, "Last-Event-ID": "0"})
+    assert [kind for _, kind, _ in parse(resp.get_data(as_text=True))] == ["created"]
+    assert time.monotonic() - started < 5
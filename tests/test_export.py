@@ -0,0 +1,47 @@
+import csv
+import io
+import json
+
+import export
+
+
+def test_export_csv(client, admin_headers, add_consultations, add_followup_answers):
+    add_consultations(2)
+    add_followup_answers(1, 2)
+
+    resp = client.get("/api/consultations/export", headers=admin_headers)
+
+    assert resp.status_code == 200
+    assert resp.is_streamed
+    assert resp.mimetype == "text/csv"
+    assert resp.headers["Content-Disposition"].startswith("attachment;")
+    rows = list(csv.DictReader(io.StringIO(resp.get_data(as_text=True))))
+    assert [(r["consultation_id"], r["text_answer"]) for r in rows] == [("1", "answer 0"), ("1", "answer 1"), ("2", "")]
+    assert rows[0]["first_name"] == "Pat"
+    assert rows[0]["primary_concern"] == "Acne"
+    assert rows[0]["initial_answer"] == "Since May"
+    assert rows[0]["followup_prompt"] == "How long has this been a concern?"
+
+
+def test_export_ndjson_in_chunks(client, admin_headers, add_consultations, add_followup_answers, monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 2)
+    monkeypatch.setattr(export, "EXPORT_CHUNK_BYTES", 1)
+    add_consultations(3)
+    add_followup_answers(2, 3)
+
+    resp = client.get("/api/consultations/export?format=ndjson&user_id=3", headers=admin_headers)
+    assert resp.mimetype == "application/x-ndjson"
+    items = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    assert [i["consultation_id"] for i in items] == [2]
+    assert [f["text_answer"] for f in items[0]["followup_answers"]] == ["answer 0", "answer 1", "answer 2"]
+
+    resp = client.get("/api/consultations/export?format=ndjson", headers=admin_headers)
+    chunks = list(resp.response)
+    assert len(chunks) == 3  # one consultation per chunk
+    assert [len(json.loads(c)["followup_answers"]) for c in chunks] == [0, 3, 0]
+
+
+def test_export_rejects_bad_arguments(client, admin_headers):
+    assert client.get("/api/consultations/export?format=xml", headers=admin_headers).status_code == 400
+    assert client.get("/api/consultations/export?user_id=x", headers=admin_headers).status_code == 400
+    assert client.get("/api/consultations/export").status_code == 401
@@ -0,0 +1,41 @@
+from app import app
+from models import Consultation, ConsultAnswer, ConsultationSummary, FollowupAnswers, FollowupQuestions, db
+
+HOT_QUERIES = {
+    "dashboard": db.select(Consultation).where(Consultation.user_id == 1).order_by(Consultation.id.desc()),
+    "admin list by status": db.select(Consultation.id)
+        .where(Consultation.status == "submitted", Consultation.id > 10)
+        .order_by(Consultation.id),
+    "admin list summaries by status": db.select(ConsultationSummary)
+        .where(ConsultationSummary.status == "submitted", ConsultationSummary.consultation_id > 10)
+        .order_by(ConsultationSummary.consultation_id),
+    "admin list summaries by patient": db.select(ConsultationSummary)
+        .where(ConsultationSummary.user_id == 1)
+        .order_by(ConsultationSummary.consultation_id),
+    "detail answers": db.select(ConsultAnswer).where(ConsultAnswer.consultation_id.in_([1, 2])),
+    "detail follow-up answers": db.select(FollowupAnswers).where(FollowupAnswers.consultation_id.in_([1, 2])),
+    "follow-ups of a question": db.select(FollowupQuestions).where(FollowupQuestions.parent_question_id == 1),
+    "delete consultations": db.select(Consultation.id).where(Consultation.primary_question_id == 1),
+    "delete consult answers": db.select(ConsultAnswer.id).where(ConsultAnswer.question_id == 1),
+    "delete follow-up answers": db.select(FollowupAnswers.id).where(FollowupAnswers.question_id == 1),
+}
+
+
+def explain(stmt):
+    """Plan text for stmt. On Postgres seq scans are switched off so an index is
+    used whenever one fits, whatever the (tiny) test tables look like."""
+    sql = str(stmt.compile(dialect=db.engine.dialect, compile_kwargs={"literal_binds": True}))
+    if db.engine.dialect.name == "postgresql":
+        db.session.execute(db.text("SET LOCAL enable_seqscan = off"))
+        rows = db.session.execute(db.text("EXPLAIN " + sql)).all()
+        return "\n".join(r[0] for r in rows)
+    rows = db.session.execute(db.text("EXPLAIN QUERY PLAN " + sql)).all()
+    return "\n".join(r[-1] for r in rows)
+
+
+def test_hot_queries_use_an_index(client):
+    with app.app_context():
+        for name, stmt in HOT_QUERIES.items():
+            plan = explain(stmt)
+            assert "index" in plan.lower(), f"{name} does not use an index:\n{plan}"
+        db.session.rollback()
@@ -1,10 +1,86 @@
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import requests
 from unittest.mock import patch
-from app import send_mailgun_email
+from app import app, send_mailgun_email
+from models import EmailOutbox, db
+from outbox import drain_outbox, enqueue_email
 
 @patch("requests.post")
 def test_mailgun_send(mock_post):
     mock_post.return_value.status_code = 200
-    ok, msg = send_mailgun_email("test@test.com", "Hello", "Test Body")
+    with app.app_context():
+        ok, msg = send_mailgun_email("test@test.com", "Hello", "Test Body")
 
     assert ok is True
     assert mock_post.called
+
+
+
+@contextmanager
+def stub_mailgun(monkeypatch, statuses):
+    """Local HTTP server standing in for MAILGUN_URL; answers with statuses in order."""
+    received = []
+    statuses = list(statuses)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"])).decode()
+            received.append({"headers": dict(self.headers), "data": parse_qs(body)})
+            self.send_response(statuses.pop(0) if statuses else 200)
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setitem(app.config, "MAILGUN_URL", f"http://127.0.0.1:{server.server_port}/messages")
+    try:
+        yield received
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_outbox_sends_once_per_key(client, monkeypatch):
+    with app.app_context():
+        enqueue_email("a@test.com", "Hi", "Body", idempotency_key="consultation-complete:1")
+        enqueue_email("a@test.com", "Hi", "Body", idempotency_key="consultation-complete:1")
+        db.session.commit()
+
+        with stub_mailgun(monkeypatch, [200]) as received:
+            http = requests.Session()
+            assert drain_outbox(send_mailgun_email, http=http) == 1
+            assert drain_outbox(send_mailgun_email, http=http) == 0
+
+        assert len(received) == 1
+        assert received[0]["headers"]["Idempotency-Key"] == "consultation-complete:1"
+        assert received[0]["data"]["to"] == ["a@test.com"]
+        assert EmailOutbox.query.one().status == "sent"
+
+
+def test_outbox_retries_with_backoff(client, monkeypatch):
+    with app.app_context():
+        enqueue_email("a@test.com", "Hi", "Body", idempotency_key="k1")
+        db.session.commit()
+
+        with stub_mailgun(monkeypatch, [503]) as received:
+            drain_outbox(send_mailgun_email)
+            msg = EmailOutbox.query.one()
+            assert (msg.status, msg.attempts) == ("pending", 1)
+
+            # not due yet, so the next pass leaves it alone
+            assert drain_outbox(send_mailgun_email) == 0
+
+            EmailOutbox.query.update({"next_attempt_at": db.func.now()})
+            db.session.commit()
+            drain_outbox(send_mailgun_email)
+
+        assert len(received) == 2
+        assert EmailOutbox.query.one().status == "sent"
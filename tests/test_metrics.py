@@ -0,0 +1,77 @@
+import logging
+import os
+import subprocess
+import sys
+
+from app import app
+from models import db
+from outbox import drain_outbox, enqueue_email
+
+
+def test_server_timing_header(client, admin_headers, add_consultations):
+    add_consultations(2)
+
+    resp = client.get("/api/consultations", headers=admin_headers)
+
+    timing = resp.headers["Server-Timing"]
+    assert timing.startswith("db;dur=")
+    assert "queries" in timing
+    assert "app;dur=" in timing
+
+
+def test_metrics_endpoint_counts_requests(client, admin_headers, add_consultations):
+    add_consultations(1)
+    client.get("/api/consultations", headers=admin_headers)
+    client.get("/api/consultations", headers=admin_headers)
+
+    resp = client.get("/metrics")
+
+    assert resp.status_code == 200
+    assert resp.content_type.startswith("text/plain")
+    body = resp.get_data(as_text=True)
+    labels = '{endpoint="/api/consultations",method="GET"}'
+    assert f"dermhub_request_duration_seconds_count{labels} 2.0" in body
+    assert 'dermhub_request_duration_seconds_bucket{endpoint="/api/consultations",le="+Inf",method="GET"} 2.0' in body
+    statements = [l for l in body.splitlines() if l.startswith(f"dermhub_request_sql_statements_total{labels}")]
+    assert float(statements[0].split()[-1]) > 0
+
+
+def test_outbox_sends_are_timed(client):
+    with app.app_context():
+        for i in range(2):
+            enqueue_email("a@test.com", "Hi", "Body", idempotency_key=f"metrics:{i}")
+        db.session.commit()
+        drain_outbox(lambda *args, **kwargs: (True, "ok"))
+
+    body = client.get("/metrics").get_data(as_text=True)
+    assert "dermhub_mailgun_request_duration_seconds_count 2.0" in body
+
+
+def test_metrics_are_summed_across_processes(tmp_path):
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    def run(code):
+        return subprocess.run([sys.executable, "-c", f"import metrics; {code}"], cwd=root, env=env,
+                              check=True, capture_output=True, text=True).stdout
+
+    for _ in range(2):  # two workers, each with its own counters
+        run("metrics.observe_mailgun(0.01)")
+    body = run("print(metrics.render_metrics().decode())")
+    assert "dermhub_mailgun_request_duration_seconds_count 2.0" in body
+
+
+def test_slow_query_log(client, admin_headers, add_consultations, caplog):
+    add_consultations(1)
+    app.config["SLOW_QUERY_MS"] = 0
+    try:
+        with caplog.at_level(logging.WARNING, logger="metrics"):
+            client.get("/api/consultations?limit=5", headers=admin_headers)
+    finally:
+        app.config["SLOW_QUERY_MS"] = None
+
+    slow = [r.fields for r in caplog.records if r.getMessage() == "slow query"]
+    fields = next(f for f in slow if "LIMIT" in f["statement"])
+    assert fields["endpoint"] == "/api/consultations"
+    # only the types of the bound values are logged
+    assert "5" not in str(fields["params"])
@@ -0,0 +1,57 @@
+import gzip
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from flask.json.provider import DefaultJSONProvider
+
+from app import app
+from responses import OrjsonProvider
+
+
+def test_orjson_provider_matches_default():
+    pytest.importorskip("orjson")
+    payload = {
+        "b": [1, 2.5, None, True],
+        "a": {"when": datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc), "amount": Decimal("1.10")},
+        "c": {3: "int key"},
+    }
+    fast = OrjsonProvider(app)
+    default = DefaultJSONProvider(app)
+
+    assert fast.dumps(payload) == default.dumps(payload, separators=(",", ":"))
+    with app.test_request_context():
+        assert fast.response(payload).get_data() == default.response(payload).get_data()
+    assert fast.loads('{"a": [1, "x"]}') == {"a": [1, "x"]}
+
+
+def test_api_responses_are_compressed(client, admin_headers, add_consultations, monkeypatch):
+    add_consultations(20)
+
+    plain = client.get("/api/consultations", headers=admin_headers)
+    assert "Content-Encoding" not in plain.headers
+    assert plain.headers["Vary"] == "Accept-Encoding"
+
+    resp = client.get("/api/consultations", headers={**admin_headers, "Accept-Encoding": "gzip, deflate"})
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert len(resp.data) < len(plain.data)
+    assert gzip.decompress(resp.data) == plain.data
+
+    # small bodies are not worth it
+    monkeypatch.setitem(app.config, "COMPRESS_MIN_BYTES", 10**6)
+    resp = client.get("/api/consultations", headers={**admin_headers, "Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in resp.headers
+
+
+def test_compressed_etag_revalidates(client, admin_headers, monkeypatch):
+    headers = {**admin_headers, "Accept-Encoding": "gzip"}
+    monkeypatch.setitem(app.config, "COMPRESS_MIN_BYTES", 0)
+
+    first = client.get("/api/questions", headers=headers)
+    assert first.headers["Content-Encoding"] == "gzip"
+    assert first.headers["ETag"].endswith('-gzip"')
+
+    again = client.get("/api/questions", headers={**headers, "If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == first.headers["ETag"]
+    assert again.headers["Vary"] == "Accept-Encoding"
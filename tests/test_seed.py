@@ -0,0 +1,36 @@
+from app import app
+from models import Consultation, FollowupAnswers, User, db
+from seed import seed_command, seed_synthetic, synthetic_username
+
+
+def test_seed_synthetic(client):
+    with app.app_context():
+        seed_synthetic(users=3, consultations=5, batch_size=2, echo=lambda msg: None)
+        # topping up to the same count adds no users
+        seed_synthetic(users=3, batch_size=2, echo=lambda msg: None)
+
+        usernames = db.session.scalars(
+            db.select(User.username).where(User.username.like("synthetic%")).order_by(User.username)
+        ).all()
+        assert usernames == [synthetic_username(i) for i in range(3)]
+        hashes = db.session.scalars(db.select(User.password_hashed).where(User.username.in_(usernames))).all()
+        assert len(set(hashes)) == 1
+        assert User.authenticate(usernames[0], "Password1!")
+
+        consults = Consultation.query.all()
+        assert len(consults) == 5
+        submitted = {c.id for c in consults if c.status == "submitted"}
+        answered = set(db.session.scalars(db.select(FollowupAnswers.consultation_id)))
+        assert answered == submitted
+
+
+def test_seed_cli(client, monkeypatch):
+    # the base seed runs create_all on its own connection, outside the test transaction
+    monkeypatch.setattr("seed.run_seed", lambda app: None)
+    result = app.test_cli_runner().invoke(seed_command, ["--users", "2", "--consultations", "3"])
+
+    assert result.exit_code == 0, result.output
+    assert "consultations: 3/3" in result.output
+    with app.app_context():
+        assert User.query.filter(User.username.like("synthetic%")).count() == 2
+        assert Consultation.query.count() == 3
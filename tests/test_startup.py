@@ -0,0 +1,60 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+# cumulative `python -X importtime` budget for `import app`, in milliseconds
+IMPORT_BUDGET_MS = int(os.environ.get("IMPORT_BUDGET_MS", 1500))
+DEFERRED_MODULES = ("PIL", "requests")
+
+
+def run_python(code, *flags):
+    env = {k: v for k, v in os.environ.items()
+           if k not in ("JWT_SECRET_KEY", "MAILGUN_DOMAIN", "MAILGUN_API_KEY", "APP_CONFIG")}
+    env["RENDER"] = "1"  # skip .env so the import sees no secrets at all
+    return subprocess.run([sys.executable, *flags, "-c", code], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+
+
+def test_import_has_no_side_effects():
+    result = run_python(
+        "import sys, app\n"
+        "print('app' in vars(app))\n"
+        f"print(sorted(m for m in {DEFERRED_MODULES!r} if m in sys.modules))\n"
+    )
+    created, deferred = result.stdout.splitlines()
+    assert created == "False"
+    assert deferred == "[]"
+
+
+def test_import_time_budget():
+    result = run_python("import app", "-X", "importtime")
+    line = [l for l in result.stderr.splitlines() if l.rstrip().endswith("| app")][-1]
+    cumulative_us = int(line.split("|")[1])
+    assert cumulative_us / 1000 < IMPORT_BUDGET_MS, line
+
+
+def test_create_app_registers_migrations():
+    env = {**os.environ, "APP_CONFIG": "testing", "FLASK_APP": "app"}
+    result = subprocess.run([sys.executable, "-m", "flask", "db", "heads"], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip().endswith("(head)")
+
+
+def test_sql_echo_is_logged_once_through_the_queue():
+    env = {**os.environ, "APP_CONFIG": "development", "SQL_ECHO": "1", "DATABASE_URL": "sqlite://",
+           "JWT_SECRET_KEY": "x", "RENDER": "1"}
+    code = (
+        "from app import create_app\n"
+        "from models import db\n"
+        "app = create_app()\n"
+        "with app.app_context():\n"
+        "    db.session.execute(db.text('SELECT 42 AS answer'))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout == ""
+    echoed = [line for line in result.stderr.splitlines() if "SELECT 42 AS answer" in line]
+    assert len(echoed) == 1
+    assert json.loads(echoed[0])["logger"].startswith("sqlalchemy.engine")
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta, timezone
+
+from app import app
+from models import Consultation, db
+
+
+def set_times(consultation_id, started_minutes_ago, took_minutes=None):
+    now = datetime.now(timezone.utc)
+    start = now - timedelta(minutes=started_minutes_ago)
+    values = {"created_at": start}
+    if took_minutes is not None:
+        values.update(status="submitted", submitted_at=start + timedelta(minutes=took_minutes))
+    with app.app_context():
+        db.session.execute(db.update(Consultation).where(Consultation.id == consultation_id).values(**values))
+        db.session.commit()
+
+
+def test_stats(client, admin_headers, add_consultations):
+    add_consultations(4)
+    set_times(1, 120, took_minutes=10)
+    set_times(2, 90, took_minutes=20)
+    set_times(3, 60, took_minutes=60)
+    set_times(4, 30)
+
+    resp = client.get("/api/stats", headers=admin_headers)
+
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data["total"] == 4
+    assert data["by_status"] == [{"status": "draft", "count": 1}, {"status": "submitted", "count": 3}]
+    assert data["by_primary_question"] == [{"id": 1, "prompt": "Acne", "count": 4}]
+    assert data["by_form"][0]["count"] == 4
+    assert sum(b["count"] for b in data["submitted"]["counts"]) == 3
+    assert round(data["median_completion_seconds"]) == 20 * 60
+
+
+def test_stats_are_cached(client, admin_headers, add_consultations, count_queries):
+    add_consultations(2)
+    client.get("/api/stats", headers=admin_headers)
+
+    add_consultations(1)
+    with count_queries() as statements:
+        resp = client.get("/api/stats", headers=admin_headers)
+
+    assert resp.get_json()["total"] == 2
+    assert not any("GROUP BY" in s for s in statements)
+
+
+def test_stats_arguments(client, admin_headers):
+    assert client.get("/api/stats?bucket=year", headers=admin_headers).status_code == 400
+    assert client.get("/api/stats?days=0", headers=admin_headers).status_code == 400
+    resp = client.get("/api/stats?bucket=week&days=7", headers=admin_headers)
+    assert resp.get_json()["submitted"]["bucket"] == "week"
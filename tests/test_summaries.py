@@ -0,0 +1,62 @@
+from app import app
+from models import Consultation, ConsultationSummary, FollowupAnswers, db
+from summaries import refresh_summaries
+
+
+def summary(consultation_id):
+    with app.app_context():
+        return db.session.get(ConsultationSummary, consultation_id)
+
+
+def test_summary_follows_the_consult_flow(client, admin_headers, patient):
+    client.post("/consult/1", data={"concern": "1"})
+    row = summary(1)
+    assert (row.status, row.primary_question_id, row.followup_answer_count) == ("draft", 1, 0)
+
+    client.post("/consult/1/followup", data={"f_answer_1": "A week"})
+    row = summary(1)
+    assert (row.status, row.followup_answer_count, row.photo_count) == ("submitted", 1, 0)
+
+    items = client.get("/api/consultations", headers=admin_headers).get_json()["items"]
+    assert items == [{
+        "id": 1,
+        "status": "submitted",
+        "user": "AB",
+        "primary_question": "Acne",
+        "answer_count": 0,
+        "followup_answer_count": 1,
+        "photo_count": 0,
+    }]
+
+
+def test_summary_follows_catalog_edits(client, admin_headers, patient):
+    client.post("/consult/1", data={"concern": "1"})
+    client.post("/consult/1/followup", data={"f_answer_1": "A week"})
+
+    version = summary(1).version
+    client.patch("/api/questions/1", json={"prompt": "Acne/Rosacea"}, headers=admin_headers)
+    items = client.get("/api/consultations", headers=admin_headers).get_json()["items"]
+    assert items[0]["primary_question"] == "Acne/Rosacea"
+    assert summary(1).version == version  # nothing rewritten
+
+    client.delete("/api/followups/1", headers=admin_headers)
+    assert summary(1).followup_answer_count == 0
+
+    client.delete("/api/questions/1", headers=admin_headers)
+    assert summary(1) is None
+
+
+def test_photo_count_counts_each_file_once(client, patient):
+    client.post("/consult/1", data={"concern": "1"})
+    with app.app_context():
+        db.session.add_all([
+            FollowupAnswers(consultation_id=1, question_id=1, file_path="uploads/a.jpg"),
+            FollowupAnswers(consultation_id=1, question_id=1, file_path="uploads/a.jpg"),
+            FollowupAnswers(consultation_id=1, question_id=1, file_path="uploads/b.jpg"),
+            FollowupAnswers(consultation_id=1, question_id=1, text_answer="A week"),
+        ])
+        db.session.flush()
+        refresh_summaries(Consultation.id == 1)
+        db.session.commit()
+
+    assert (summary(1).followup_answer_count, summary(1).photo_count) == (4, 2)
@@ -0,0 +1,90 @@
+"""Content-addressed storage for consultation photos.
+
+Uploads are copied to disk in chunks while being hashed and end up at
+UPLOAD_FOLDER/ab/cd/<sha256><ext>, so identical photos are stored once and two
+patients sending "IMG_0001.jpg" no longer overwrite each other.
+"""
+import hashlib
+import os
+import tempfile
+
+from flask import current_app
+from werkzeug.utils import secure_filename
+
+from models import db, Upload
+
+CHUNK_SIZE = 64 * 1024
+DEFAULT_MAX_UPLOAD_BYTES = 15 * 1024 * 1024
+ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic"}
+PUBLIC_PREFIX = "static/uploads"
+
+
+class UploadRejected(ValueError):
+    """Raised when an uploaded file can't be stored."""
+
+
+def _extension(filename):
+    ext = os.path.splitext(secure_filename(filename))[1].lower()
+    if ext not in ALLOWED_EXTENSIONS:
+        raise UploadRejected("Photos must be JPG, PNG, GIF, WebP or HEIC")
+    return ".jpg" if ext == ".jpeg" else ext
+
+
+def upload_root():
+    return current_app.config["UPLOAD_FOLDER"]
+
+
+def upload_path(upload):
+    """Absolute path of a stored upload on this host."""
+    return os.path.join(upload_root(), upload.storage_key)
+
+
+def public_path(upload):
+    """Path the browser can fetch, in the same form legacy file_path values use."""
+    return f"{PUBLIC_PREFIX}/{upload.storage_key}"
+
+
+def store_upload(file):
+    """Stream a werkzeug FileStorage into storage and return its Upload row.
+
+    The row is added to the session but not committed. Raises UploadRejected for
+    disallowed types and for files over MAX_UPLOAD_BYTES.
+    """
+    ext = _extension(file.filename)
+    max_bytes = current_app.config.get("MAX_UPLOAD_BYTES", DEFAULT_MAX_UPLOAD_BYTES)
+
+    tmp_dir = os.path.join(upload_root(), "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = file.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadRejected(f"Photos must be under {max_bytes // (1024 * 1024)} MB")
+                digest.update(chunk)
+                out.write(chunk)
+
+        sha256 = digest.hexdigest()
+        upload = db.session.get(Upload, sha256)
+        if upload is None:
+            upload = Upload(sha256=sha256, extension=ext, size_bytes=size)
+            db.session.add(upload)
+
+        dest = upload_path(upload)
+        if os.path.exists(dest):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            os.replace(tmp_path, dest)
+        return upload
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise